@@ -0,0 +1,164 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import chess
+
+from Core.Search.Profiler import Profiler
+from Core.Search.Search import Search
+from Core.Search.Tablebase import Tablebase
+
+# (category, fen), the total node count over these is the search's signature, any change to it is a change in
+# search behaviour
+POSITIONS = [
+    ("opening", chess.STARTING_FEN),
+    ("opening", "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"),
+    ("opening", "rnbqkb1r/pp1p1ppp/4pn2/2p5/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 0 4"),
+    ("opening", "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5"),
+    ("middlegame", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("middlegame", "r1b1k2r/ppppnppp/2n2q2/2b5/3NP3/2P1B3/PP3PPP/RN1QKB1R w KQkq - 0 1"),
+    ("middlegame", "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10"),
+    ("middlegame", "r1bq1rk1/ppp1bppp/2n2n2/3pp3/2PP4/2N1PN2/PP2BPPP/R1BQ1RK1 w - - 0 7"),
+    ("tactics", "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"),
+    ("tactics", "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"),
+    ("tactics", "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1"),
+    ("tactics", "r1b2rk1/2q1b1pp/p2ppn2/1p6/3QP3/1BN1B3/PPP3PP/R4RK1 w - - 0 1"),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("endgame", "8/8/1k6/8/8/8/4P3/4K3 w - - 0 1"),
+    ("endgame", "1k6/8/8/8/8/8/4RK2/r7 w - - 0 1"),
+    ("endgame", "8/5pk1/6p1/8/8/6P1/5PK1/8 w - - 0 1"),
+]
+
+DEFAULT_DEPTH = 5
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_position(fen, depth, profile=False):
+    # a fresh engine and no time limit, so the node count only depends on the search itself
+    search = Search(tablebase=Tablebase(), profile=profile)
+
+    start = time.perf_counter()
+    best_move, evaluation = search.search(chess.Board(fen), max_depth=depth, time_limit=float('inf'))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'fen': fen,
+        'best_move': best_move.uci() if best_move else None,
+        'evaluation': evaluation,
+        'nodes': search.nodes_searched,
+        'q_nodes': search.q_nodes_searched,
+        'time': elapsed,
+    }
+
+    return result, search.profiler
+
+
+def run(depth=DEFAULT_DEPTH, positions=POSITIONS, verbose=True, profile=False):
+    # profiling slows the search down but leaves the node counts as they are
+    results = []
+    profilers = []
+
+    for index, (category, fen) in enumerate(positions, start=1):
+        result, profiler = bench_position(fen, depth, profile)
+        result['category'] = category
+        results.append(result)
+        if profiler is not None:
+            profilers.append(profiler)
+
+        if verbose:
+            nodes = result['nodes'] + result['q_nodes']
+            print(f"Position {index}/{len(positions)} ({category}): {result['best_move']} "
+                  f"nodes {nodes} time {result['time']:.2f}s")
+
+    total_nodes = sum(result['nodes'] + result['q_nodes'] for result in results)
+    total_time = sum(result['time'] for result in results)
+
+    return {
+        'depth': depth,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'positions': results,
+        'total_nodes': total_nodes,
+        'total_time': total_time,
+        'nps': int(total_nodes / total_time) if total_time else 0,
+        'profile': Profiler.combine(profilers).report() if profile else None,
+    }
+
+
+def print_profile(profile):
+    print("===========================")
+    print(f"{'component':<42}{'calls':>10}{'time (s)':>10}{'us/call':>9}{'share':>8}")
+    for label, stats in profile['components'].items():
+        print(f"{label:<42}{stats['calls']:>10}{stats['time']:>10.2f}{stats['time_per_call_us']:>9.1f}"
+              f"{stats['share']:>8.1%}")
+
+    print("===========================")
+    print(f"{'depth':<6}{'nodes':>10}{'tt hits':>9}{'cutoffs':>9}{'branching':>11}")
+    for depth, stats in profile['depths'].items():
+        branching_factor = f"{stats['branching_factor']:.2f}" if stats['branching_factor'] else "-"
+        print(f"{depth:<6}{stats['nodes'] + stats['q_nodes']:>10}{stats['tt_hit_rate']:>9.1%}"
+              f"{stats['tt_cutoffs']:>9}{branching_factor:>11}")
+
+
+def compare(results, baseline):
+    # positions whose node count moved are where the search changed, nps is the speed regression signal
+    if baseline['depth'] != results['depth']:
+        print(f"Baseline was searched to depth {baseline['depth']}, not {results['depth']}")
+        return
+
+    baseline_nodes = {position['fen']: position['nodes'] + position['q_nodes'] for position in baseline['positions']}
+
+    for position in results['positions']:
+        previous = baseline_nodes.get(position['fen'])
+        nodes = position['nodes'] + position['q_nodes']
+        if previous is not None and previous != nodes:
+            print(f"Changed        : {position['fen']} {previous} -> {nodes}")
+
+    if baseline['total_nodes'] == results['total_nodes']:
+        print(f"Signature      : unchanged from {baseline['commit']}")
+    else:
+        print(f"Signature      : {baseline['total_nodes']} -> {results['total_nodes']} since {baseline['commit']}")
+
+    if baseline['nps']:
+        print(f"Nodes/second   : {(results['nps'] / baseline['nps'] - 1) * 100:+.1f}% since {baseline['commit']}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Search a fixed set of positions to a fixed depth.")
+    parser.add_argument("depth", type=int, nargs="?", default=DEFAULT_DEPTH)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="compare against the results of an earlier run")
+    parser.add_argument("--profile", action="store_true", help="time the search's components, slows it down")
+    args = parser.parse_args(args)
+
+    results = run(args.depth, profile=args.profile)
+
+    if args.profile:
+        print_profile(results['profile'])
+
+    print("===========================")
+    print(f"Total time (s) : {results['total_time']:.2f}")
+    print(f"Nodes searched : {results['total_nodes']}")
+    print(f"Nodes/second   : {results['nps']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import random
+import time
+
+import chess
+
+from Core.Search.Position import Position
+from Core.Search.Zobrist import Zobrist
+
+
+def sample_games(num_games=20, max_moves=80, seed=0):
+    rng = random.Random(seed)
+    games = []
+
+    for _ in range(num_games):
+        board = chess.Board()
+        moves = []
+        while len(moves) < max_moves and not board.is_game_over():
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            moves.append(move)
+
+        games.append(moves)
+
+    return games
+
+
+def time_push_pop(board_type, games, key_function, repeats=5):
+    best = float('inf')
+    nodes = sum(len(moves) for moves in games)
+
+    # best of several runs to keep scheduler noise out of the comparison
+    for _ in range(repeats):
+        start = time.perf_counter()
+
+        for moves in games:
+            board = board_type()
+            for move in moves:
+                board.push(move)
+                key_function(board)
+
+            while board.move_stack:
+                board.pop()
+
+        best = min(best, time.perf_counter() - start)
+
+    return best / nodes, nodes
+
+
+def main(num_games=200):
+    games = sample_games(num_games)
+
+    baseline, nodes = time_push_pop(chess.Board, games, lambda board: None)
+    transposition_key, _ = time_push_pop(chess.Board, games, lambda board: hash(board._transposition_key()))
+    full_zobrist, _ = time_push_pop(chess.Board, games, Zobrist.hash_board)
+
+    # the board the search runs on, which takes its moves encoded
+    engine_games = [[Position.encode_move(move) for move in moves] for moves in games]
+    engine_baseline, _ = time_push_pop(Position, engine_games, lambda board: None)
+    incremental, _ = time_push_pop(Position, engine_games, lambda board: board.zobrist_key)
+
+    # what a search node pays for its key plus repetition detection
+    repetition_before, _ = time_push_pop(
+        chess.Board, games, lambda board: (hash(board._transposition_key()), board.is_repetition(2))
+    )
+    repetition_after, _ = time_push_pop(
+        Position, engine_games, lambda board: (board.zobrist_key, board.is_repetition_draw())
+    )
+
+    print(f"Positions: {nodes}")
+    # costs are on top of each board's own push/pop. Position updates its keys inside push/pop, so that part of
+    # the incremental key's cost is in its push/pop line
+    print(f"push/pop only, chess.Board:        {baseline * 1e6:.2f}us per node")
+    print(f"push/pop only, Position:           {engine_baseline * 1e6:.2f}us per node")
+    print(f"hash(_transposition_key()):        {(transposition_key - baseline) * 1e6:.2f}us per node")
+    print(f"zobrist from scratch:              {(full_zobrist - baseline) * 1e6:.2f}us per node")
+    print(f"incremental zobrist (Position):    {(incremental - engine_baseline) * 1e6:.2f}us per node")
+    print(f"key + repetition, chess.Board:     {(repetition_before - baseline) * 1e6:.2f}us per node")
+    print(f"key + repetition, Position:        {(repetition_after - engine_baseline) * 1e6:.2f}us per node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import array
+import sys
+import time
+
+import chess
+
+from Core.Search.Position import Position
+
+# (name, fen, leaf counts from depth 1), the standard positions from the chess programming wiki
+POSITIONS = [
+    ("start", chess.STARTING_FEN, (20, 400, 8902, 197281, 4865609)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", (48, 2039, 97862, 4085603)),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", (14, 191, 2812, 43238, 674624)),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", (6, 264, 9467, 422333)),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", (44, 1486, 62379, 2103487)),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     (46, 2079, 89890, 3894594)),
+]
+
+BOARD_TYPES = {
+    'chess': chess.Board,
+    'engine': Position,
+}
+
+DEFAULT_DEPTH = 3
+
+
+# leaf counts of subtrees already walked, keyed by the board's zobrist key and the remaining depth
+class PerftTable:
+    DEFAULT_SIZE_MB = 16
+
+    # each entry is two 64 bit words: the key mixed with the depth, and the count
+    ENTRY_WORDS = 2
+
+    MASK_64 = (1 << 64) - 1
+    # spreads the depths over the key bits so the same position at another depth never matches
+    DEPTH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        num_entries = max(1, (size_mb * 1024 * 1024) // (self.ENTRY_WORDS * 8))
+        num_entries = 1 << (num_entries.bit_length() - 1)
+
+        self.entry_mask = num_entries - 1
+        self.table = array.array('Q', bytes(num_entries * self.ENTRY_WORDS * 8))
+
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key, depth):
+        self.probes += 1
+
+        index = (key & self.entry_mask) * self.ENTRY_WORDS
+        if self.table[index] != key ^ ((depth * self.DEPTH_MULTIPLIER) & self.MASK_64):
+            return None
+
+        self.hits += 1
+        return self.table[index + 1]
+
+    def store(self, key, depth, nodes):
+        # always replace, deeper entries are rarer but cheaper to redo than to keep track of
+        index = (key & self.entry_mask) * self.ENTRY_WORDS
+        self.table[index] = key ^ ((depth * self.DEPTH_MULTIPLIER) & self.MASK_64)
+        self.table[index + 1] = nodes
+
+
+def perft(board, depth, bulk=True, table=None):
+    if depth == 0:
+        return 1
+
+    # the last ply only needs the number of legal moves, not the positions after them
+    if bulk and depth == 1:
+        return len(list(board.legal_moves))
+
+    if table is not None:
+        key = board.zobrist_key
+        nodes = table.probe(key, depth)
+        if nodes is not None:
+            return nodes
+
+    nodes = 0
+    for move in list(board.legal_moves):
+        board.push(move)
+        nodes += perft(board, depth - 1, bulk, table)
+        board.pop()
+
+    if table is not None:
+        table.store(key, depth, nodes)
+
+    return nodes
+
+
+def divide(board, depth, bulk=True, table=None):
+    # leaf count under each root move, to find the move a generator gets wrong
+    counts = []
+    for move in list(board.legal_moves):
+        board.push(move)
+        counts.append((move, perft(board, depth - 1, bulk, table)))
+        board.pop()
+
+    return counts
+
+
+def reference_perft(fen, depth):
+    # python-chess on its own, one node at a time, as the count to check against
+    return perft(chess.Board(fen), depth, bulk=False)
+
+
+def run_position(board_type, fen, depth, bulk=True, hash_size_mb=0, show_divide=False):
+    board = board_type(fen)
+    table = PerftTable(hash_size_mb) if hash_size_mb else None
+
+    start = time.perf_counter()
+    if show_divide:
+        counts = divide(board, depth, bulk, table)
+        nodes = sum(count for _, count in counts)
+    else:
+        counts = None
+        nodes = perft(board, depth, bulk, table)
+    elapsed = time.perf_counter() - start
+
+    if counts is not None:
+        for move, count in counts:
+            print(f"{board.uci(move)}: {count}")
+
+    return nodes, elapsed
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Count the leaf nodes of the move tree and check them.")
+    parser.add_argument("depth", type=int, nargs="?", default=DEFAULT_DEPTH)
+    parser.add_argument("--fen", help="a single position instead of the standard ones")
+    parser.add_argument("--board", choices=BOARD_TYPES, default='engine', help="board implementation to walk")
+    parser.add_argument("--divide", action="store_true", help="print the count under each root move")
+    parser.add_argument("--hash", type=int, default=0, metavar="MB", help="perft hash table size, 0 to disable")
+    parser.add_argument("--no-bulk", action="store_true", help="push and pop the last ply too")
+    parser.add_argument("--no-check", action="store_true", help="skip the cross-check against python-chess")
+    args = parser.parse_args(args)
+
+    board_type = BOARD_TYPES[args.board]
+    if args.hash and not hasattr(board_type(), 'zobrist_key'):
+        parser.error(f"--hash needs a board that keeps a zobrist key, not {args.board}")
+
+    positions = [("fen", args.fen, ())] if args.fen else POSITIONS
+
+    total_nodes = 0
+    total_time = 0
+    failures = 0
+
+    for name, fen, expected in positions:
+        nodes, elapsed = run_position(board_type, fen, args.depth, not args.no_bulk, args.hash, args.divide)
+        total_nodes += nodes
+        total_time += elapsed
+
+        status = ""
+        if args.depth <= len(expected) and nodes != expected[args.depth - 1]:
+            status += f" expected {expected[args.depth - 1]}"
+        if not args.no_check:
+            reference = reference_perft(fen, args.depth)
+            if nodes != reference:
+                status += f" python-chess counts {reference}"
+
+        failures += bool(status)
+        print(f"{name}: {nodes} nodes in {elapsed:.2f}s ({int(nodes / elapsed) if elapsed else 0} nodes/second)"
+              f"{' MISMATCH' + status if status else ''}")
+
+    print("===========================")
+    print(f"Nodes        : {total_nodes}")
+    print(f"Nodes/second : {int(total_nodes / total_time) if total_time else 0}")
+
+    if failures:
+        print(f"{failures} position(s) did not match")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
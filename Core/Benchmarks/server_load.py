@@ -0,0 +1,82 @@
+import threading
+import time
+
+import chess
+
+from Core.Benchmarks.hashing import sample_games
+from Core.Server.EnginePool import EnginePool
+from Core.Server.ResultCache import ResultCache
+
+
+def game_positions(moves):
+    board = chess.Board()
+    positions = [board.fen()]
+    for move in moves:
+        board.push(move)
+        positions.append(board.fen())
+
+    return positions
+
+
+def run_client(app, client_id, positions, depth, latencies, errors):
+    client = app.test_client()
+
+    for fen in positions:
+        start = time.perf_counter()
+        response = client.post("/best-move", json={"fen": fen, "depth": depth, "session_id": f"client-{client_id}"})
+        latencies.append(time.perf_counter() - start)
+
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_load(app, games, depth):
+    latencies = []
+    errors = []
+
+    threads = [
+        threading.Thread(target=run_client, args=(app, client_id, positions, depth, latencies, errors))
+        for client_id, positions in enumerate(games)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def main(num_clients=8, depth=3, moves_per_game=12, pool_size=EnginePool.DEFAULT_SIZE):
+    import server
+
+    # every client plays its own game, one request per position as if it were playing along
+    games = [game_positions(moves) for moves in sample_games(num_clients, moves_per_game, seed=1)]
+
+    print(f"Clients: {num_clients}, depth {depth}")
+
+    # the baseline is a single shared engine the clients take turns on. the pool's engines are threads, so under the
+    # gil any gain comes from requests not queueing behind each other and from warm transposition tables, not from
+    # searching in parallel
+    for name, size in (("single engine", 1), (f"pool of {pool_size}", pool_size)):
+        # fresh engines and an empty result cache, so neither run is warmed up by the other
+        server.engine_pool = EnginePool(size)
+        server.result_cache = ResultCache()
+
+        latencies, errors, elapsed = run_load(server.app, games, depth)
+
+        print(f"{name}: requests: {len(latencies)}, errors: {len(errors)}, "
+              f"throughput: {len(latencies) / elapsed:.2f} requests/s, "
+              f"latency p50: {percentile(latencies, 0.5) * 1000:.0f}ms, "
+              f"p99: {percentile(latencies, 0.99) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
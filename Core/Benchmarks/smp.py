@@ -0,0 +1,51 @@
+import time
+
+import chess
+
+from Core.Search.LazySMP import LazySMP
+from Core.Search.Tablebase import Tablebase
+
+POSITIONS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "rnbqkb1r/pp1p1ppp/4pn2/2p5/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 0 4",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+
+
+def time_to_depth(num_workers, depth, fens=POSITIONS):
+    smp = LazySMP(num_workers, tablebase=Tablebase())
+
+    total_time = 0
+    total_nodes = 0
+    try:
+        for fen in fens:
+            # every position starts from an empty table so runs don't help each other
+            smp.new_game()
+
+            start = time.perf_counter()
+            smp.search(chess.Board(fen), depth, time_limit=float('inf'))
+            total_time += time.perf_counter() - start
+            total_nodes += smp.nodes_searched
+    finally:
+        smp.close()
+
+    return total_time, total_nodes
+
+
+def main(worker_counts=(1, 2, 4, 8), depth=5):
+    print(f"Positions: {len(POSITIONS)}, depth {depth}")
+    print(f"{'workers':>7} {'time':>8} {'nodes':>9} {'nps':>8} {'speedup':>8}")
+
+    baseline = None
+    for num_workers in worker_counts:
+        total_time, total_nodes = time_to_depth(num_workers, depth)
+        baseline = baseline or total_time
+
+        print(f"{num_workers:>7} {total_time:>7.2f}s {total_nodes:>9} {total_nodes / total_time:>8.0f} "
+              f"{baseline / total_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
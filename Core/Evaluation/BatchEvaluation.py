@@ -0,0 +1,231 @@
+import chess
+import numpy as np
+
+from Core.Evaluation.EvaluationState import EvaluationState
+
+
+class BatchEvaluation:
+    # columns of a packed position, the same bitboards chess.Board keeps
+    PAWNS, KNIGHTS, BISHOPS, ROOKS, QUEENS, KINGS, WHITE, BLACK = range(8)
+    NUM_COLUMNS = 8
+
+    CHUNK_SIZE = 1 << 15
+
+    SQUARE_SHIFTS = np.arange(64, dtype=np.uint64)
+
+    def __init__(self, evaluation):
+        self.piece_values = evaluation.PIECE_VALUES
+        self.endgame_piece_weights = evaluation.ENDGAME_PIECE_WEIGHTS
+        self.endgame_starting_weight = evaluation.ENDGAME_STARTING_WEIGHT
+
+        evaluation_data = evaluation.evaluation_data
+        move_data = evaluation.move_data
+
+        # indexed [colour][piece_type][square]
+        midgame_tables, endgame_tables = EvaluationState.get_tables()
+        self.midgame_tables = np.array(midgame_tables, dtype=np.int64)
+        self.endgame_tables = np.array(endgame_tables, dtype=np.int64)
+
+        self.passed_pawn_masks = [
+            np.array(evaluation_data.get_passed_pawn_masks(colour), dtype=np.uint64) for colour in (False, True)
+        ]
+        self.isolation_masks = np.array(
+            [evaluation_data.adjacent_file_masks[chess.square_file(square)] for square in range(64)], dtype=np.uint64
+        )
+
+        bonuses = evaluation.PASSED_PAWN_BONUSES
+        self.passed_pawn_bonuses = [
+            np.array([bonuses[chess.square_rank(square)] if chess.square_rank(square) < len(bonuses) else 0
+                      for square in range(64)], dtype=np.int64),
+            np.array([bonuses[7 - chess.square_rank(square)] if 7 - chess.square_rank(square) < len(bonuses) else 0
+                      for square in range(64)], dtype=np.int64),
+        ]
+        self.isolated_pawn_penalty = np.array(evaluation.ISOLATED_PAWN_PENALTY, dtype=np.int64)
+        self.doubled_pawn_penalty = evaluation.DOUBLED_PAWN_PENALTY
+
+        # shield squares padded to six per king square, missing ones weigh nothing
+        shield_scores = evaluation.KING_PAWN_SHIELD_SCORES
+        self.shield_squares = [np.zeros((64, 6), dtype=np.int64) for _ in range(2)]
+        self.shield_weights = [np.zeros((64, 6), dtype=np.int64) for _ in range(2)]
+        for colour in (chess.WHITE, chess.BLACK):
+            for king_square, squares in enumerate(evaluation_data.get_shield_squares(colour)):
+                for i, square in enumerate(squares):
+                    self.shield_squares[colour][king_square, i] = square
+                    self.shield_weights[colour][king_square, i] = shield_scores[min(i, len(shield_scores) - 1)]
+
+        # the three files around the king, as front spans from the king's rank
+        self.open_file_masks = [np.zeros((64, 3), dtype=np.uint64) for _ in range(2)]
+        self.open_file_weights = np.zeros((64, 3), dtype=np.int64)
+        for colour in (chess.WHITE, chess.BLACK):
+            front_span_masks = evaluation_data.get_front_span_masks(colour)
+            for king_square in range(64):
+                king_file = chess.square_file(king_square)
+                clamped_king_file = max(1, min(6, king_file))
+                for i, attack_file in enumerate(range(clamped_king_file - 1, clamped_king_file + 2)):
+                    attack_square = chess.square(attack_file, chess.square_rank(king_square))
+                    self.open_file_masks[colour][king_square, i] = front_span_masks[attack_square]
+                    self.open_file_weights[king_square, i] = 25 if attack_file == king_file else 15
+
+        self.orthogonal_distance = np.asarray(move_data.orthogonal_distance, dtype=np.int64)
+        self.centre_manhattan_distance = np.asarray(move_data.centre_manhattan_distance, dtype=np.int64)
+
+    @classmethod
+    def pack(cls, boards):
+        return np.array(
+            [
+                [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                 board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]]
+                for board in boards
+            ],
+            dtype=np.uint64,
+        ).reshape(-1, cls.NUM_COLUMNS)
+
+    @classmethod
+    def pack_fens(cls, fens):
+        boards = []
+        for fen in fens:
+            try:
+                boards.append(chess.Board(fen))
+            except ValueError:
+                # epd lines carry operations instead of move counters
+                boards.append(chess.Board.from_epd(fen)[0])
+
+        return cls.pack(boards)
+
+    def evaluate(self, positions):
+        positions = np.asarray(positions, dtype=np.uint64).reshape(-1, self.NUM_COLUMNS)
+        scores = np.empty(len(positions), dtype=np.int64)
+
+        for start in range(0, len(positions), self.CHUNK_SIZE):
+            chunk = positions[start:start + self.CHUNK_SIZE]
+            scores[start:start + len(chunk)] = self._evaluate_chunk(chunk)
+
+        return scores
+
+    def _squares(self, bitboards):
+        return ((bitboards[:, None] >> self.SQUARE_SHIFTS) & np.uint64(1)).astype(bool)
+
+    def _evaluate_chunk(self, positions):
+        colour_masks = {chess.WHITE: positions[:, self.WHITE], chess.BLACK: positions[:, self.BLACK]}
+        pawns = positions[:, self.PAWNS]
+
+        # piece_squares[colour][piece_type] is an (n, 64) occupancy array
+        piece_squares = {
+            colour: {
+                piece_type: self._squares(positions[:, piece_type - 1] & colour_masks[colour])
+                for piece_type in range(1, 7)
+            }
+            for colour in (chess.WHITE, chess.BLACK)
+        }
+
+        counts = {}
+        material_scores = {}
+        endgame_t = {}
+        piece_square_scores = {}
+        king_squares = {}
+
+        for colour in (chess.WHITE, chess.BLACK):
+            counts[colour] = {
+                piece_type: piece_squares[colour][piece_type].sum(axis=1) for piece_type in range(1, 7)
+            }
+
+            material_scores[colour] = sum(
+                counts[colour][piece_type] * value for piece_type, value in self.piece_values.items()
+            )
+
+            weight = sum(
+                counts[colour][piece_type] * piece_weight
+                for piece_type, piece_weight in self.endgame_piece_weights.items()
+            )
+            endgame_t[colour] = 1 - np.minimum(1, weight / self.endgame_starting_weight)
+
+            piece_square_scores[colour] = self._piece_square_scores(piece_squares[colour], colour, endgame_t[colour])
+            king_squares[colour] = piece_squares[colour][chess.KING].argmax(axis=1)
+
+        scores = {}
+        for colour in (chess.WHITE, chess.BLACK):
+            enemy = not colour
+            friendly_pawns = pawns & colour_masks[colour]
+
+            pawn_score = self._pawn_scores(colour, piece_squares[colour][chess.PAWN], friendly_pawns,
+                                           pawns & colour_masks[enemy])
+            shield_score = self._king_pawn_shield_scores(
+                colour, king_squares[colour], piece_squares[colour][chess.PAWN], pawns,
+                counts[enemy], endgame_t[enemy], piece_square_scores[enemy],
+            )
+            mop_up_score = self._mop_up_scores(
+                king_squares[colour], king_squares[enemy],
+                material_scores[colour], material_scores[enemy], endgame_t[enemy],
+            )
+
+            scores[colour] = material_scores[colour] + piece_square_scores[colour] + pawn_score \
+                + shield_score + mop_up_score
+
+        return scores[chess.WHITE] - scores[chess.BLACK]
+
+    def _piece_square_scores(self, colour_piece_squares, colour, endgame_t):
+        midgame_tables = self.midgame_tables[int(colour)]
+        endgame_tables = self.endgame_tables[int(colour)]
+
+        # same order as the scalar evaluation, only pawns and kings are tapered
+        score = 0
+        for piece_type in range(1, 7):
+            piece_squares = colour_piece_squares[piece_type].astype(np.int64)
+            midgame_score = piece_squares @ midgame_tables[piece_type]
+            if piece_type in (chess.PAWN, chess.KING):
+                endgame_score = piece_squares @ endgame_tables[piece_type]
+                score = score + midgame_score * (1 - endgame_t) + endgame_score * endgame_t
+            else:
+                score = score + midgame_score
+
+        return np.trunc(score).astype(np.int64)
+
+    def _pawn_scores(self, colour, friendly_pawn_squares, friendly_pawns, enemy_pawns):
+        passed = friendly_pawn_squares & ((enemy_pawns[:, None] & self.passed_pawn_masks[colour]) == 0)
+        isolated = friendly_pawn_squares & ((friendly_pawns[:, None] & self.isolation_masks) == 0)
+
+        score = passed.astype(np.int64) @ self.passed_pawn_bonuses[colour]
+        score += self.isolated_pawn_penalty[isolated.sum(axis=1)]
+
+        pawns_per_file = friendly_pawn_squares.reshape(-1, 8, 8).sum(axis=1)
+        score += self.doubled_pawn_penalty * np.maximum(pawns_per_file - 1, 0).sum(axis=1)
+
+        return score
+
+    def _king_pawn_shield_scores(self, colour, king_squares, friendly_pawn_squares, pawns,
+                                 enemy_counts, enemy_endgame_t, enemy_piece_square_scores):
+        rows = np.arange(len(king_squares))[:, None]
+
+        shield_squares = self.shield_squares[colour][king_squares]
+        shield_weights = self.shield_weights[colour][king_squares]
+        missing = ~friendly_pawn_squares[rows, shield_squares]
+        shield_penalty = ((missing * shield_weights).sum(axis=1)) ** 2
+
+        open_files = (pawns[:, None] & self.open_file_masks[colour][king_squares]) == 0
+        open_file_penalty = (open_files * self.open_file_weights[king_squares]).sum(axis=1)
+
+        king_files = king_squares % 8
+        king_on_wing = (king_files <= 2) | (king_files >= 5)
+
+        enemy_development_score = np.maximum(0, np.minimum(1, (enemy_piece_square_scores + 10) / 130))
+        penalty = np.where(king_on_wing, shield_penalty, 0)
+        uncastled_king_penalty = np.where(king_on_wing, 0, 50 * enemy_development_score)
+
+        enemy_rooks = enemy_counts[chess.ROOK]
+        enemy_queens = enemy_counts[chess.QUEEN]
+        open_file_applies = (enemy_rooks > 1) | ((enemy_rooks == 0) & (enemy_queens > 0))
+        open_file_penalty = np.where(open_file_applies, open_file_penalty, 0)
+
+        pawn_shield_weight = 1 - enemy_endgame_t
+        pawn_shield_weight = np.where(enemy_queens == 0, pawn_shield_weight * 0.6, pawn_shield_weight)
+
+        score = np.trunc((-penalty - open_file_penalty - uncastled_king_penalty) * pawn_shield_weight)
+        return np.where(enemy_endgame_t >= 1, 0, score).astype(np.int64)
+
+    def _mop_up_scores(self, friendly_king_squares, enemy_king_squares,
+                       friendly_material, enemy_material, enemy_endgame_t):
+        score = (14 - self.orthogonal_distance[friendly_king_squares, enemy_king_squares]) * 4
+        score += self.centre_manhattan_distance[enemy_king_squares] * 10
+
+        applies = friendly_material >= enemy_material + self.piece_values[chess.PAWN] * 2
+        return np.where(applies, np.trunc(score * enemy_endgame_t), 0).astype(np.int64)
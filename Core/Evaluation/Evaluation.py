@@ -1,13 +1,12 @@
 import chess
 
-from Core.Evaluation.PieceSquareTables import PieceSquareTables, PieceTables
+from Core.Evaluation.BatchEvaluation import BatchEvaluation
+from Core.Evaluation.EvaluationState import EvaluationState
+from Core.Evaluation.PawnHashTable import PawnEntry, PawnHashTable
+from Core.Evaluation.PieceSquareTables import PieceSquareTables
 from Core.Evaluation.PrecomputedEvaluationData import PrecomputedEvaluationData
 from Core.Evaluation.PrecomputedMoveData import PrecomputedMoveData
-
-
-def get_count_of_pieces_of_colour(board: chess.Board, piece: chess.PieceType, colour: chess.Color):
-    pieces = board.pieces(piece, colour)
-    return len(pieces)
+from Core.Search.Zobrist import Zobrist
 
 
 class Evaluation:
@@ -22,51 +21,74 @@ class Evaluation:
 
     PASSED_PAWN_BONUSES = [0, 120, 80, 50, 30, 15, 15]
     ISOLATED_PAWN_PENALTY = [0, -10, -25, -50, -75, -75, -75, -75, -75]
+    DOUBLED_PAWN_PENALTY = -15
     KING_PAWN_SHIELD_SCORES = [4, 7, 4, 3, 6, 3]
 
     # change to find sweet spot
     ENDGAME_MATERIAL_SCORE = PIECE_VALUES[chess.ROOK] * 2 + PIECE_VALUES[chess.BISHOP] + PIECE_VALUES[chess.KNIGHT]
 
+    ENDGAME_PIECE_WEIGHTS = {
+        chess.QUEEN: 45,
+        chess.ROOK: 20,
+        chess.KNIGHT: 10,
+        chess.BISHOP: 10
+    }
+
+    ENDGAME_STARTING_WEIGHT = (
+        2 * ENDGAME_PIECE_WEIGHTS[chess.ROOK] +
+        2 * ENDGAME_PIECE_WEIGHTS[chess.BISHOP] +
+        2 * ENDGAME_PIECE_WEIGHTS[chess.KNIGHT] +
+        1 * ENDGAME_PIECE_WEIGHTS[chess.QUEEN]
+    )
+
     CHECKMATE_SCORE = 9999999999
 
     def __init__(self):
         self.board = None
         self.piece_square_tables = PieceSquareTables()
 
-        self.piece_type_mapping = {
-            PieceTables.PAWNS_START: chess.PAWN,
-            PieceTables.KNIGHTS: chess.KNIGHT,
-            PieceTables.BISHOPS: chess.BISHOP,
-            PieceTables.ROOKS: chess.ROOK,
-            PieceTables.QUEENS: chess.QUEEN,
-        }
-
         self.evaluation_data = PrecomputedEvaluationData()
         self.move_data = PrecomputedMoveData()
 
+        self.pawn_table = PawnHashTable()
+
+        self.batch_evaluation = None
+
     def get_board(self):
         return self.board
 
+    def evaluate_batch(self, positions):
+        # positions packed by BatchEvaluation.pack, scores agree with evaluate on every row
+        if self.batch_evaluation is None:
+            self.batch_evaluation = BatchEvaluation(self)
+
+        return self.batch_evaluation.evaluate(positions)
+
     def evaluate(self, board: chess.Board):
         self.board = board
 
-        white_material_info = MaterialInfo(board, chess.WHITE)
-        black_material_info = MaterialInfo(board, chess.BLACK)
+        # boards used by the search keep their state up to date as moves are made
+        state = getattr(board, 'eval_state', None) or EvaluationState.from_board(board)
 
-        white_material_score = white_material_info.get_material_score()
-        black_material_score = black_material_info.get_material_score()
+        white_material_info = MaterialInfo(state, chess.WHITE)
+        black_material_info = MaterialInfo(state, chess.BLACK)
 
-        white_endgame_T = white_material_info.get_endgame_t()
-        black_endgame_T = black_material_info.get_endgame_t()
+        white_material_score = white_material_info.material_score
+        black_material_score = black_material_info.material_score
 
-        white_piece_square_score = self._evaluate_piece_square_tables(chess.WHITE, white_endgame_T)
-        black_piece_square_score = self._evaluate_piece_square_tables(chess.BLACK, black_endgame_T)
+        white_endgame_T = white_material_info.endgameT
+        black_endgame_T = black_material_info.endgameT
 
-        white_pawn_score = self._evaluate_pawns(chess.WHITE)
-        black_pawn_score = self._evaluate_pawns(chess.BLACK)
+        white_piece_square_score = self._evaluate_piece_square_tables(state, chess.WHITE, white_endgame_T)
+        black_piece_square_score = self._evaluate_piece_square_tables(state, chess.BLACK, black_endgame_T)
 
-        white_pawn_shield_score = self._evaluate_king_pawn_shield(chess.WHITE, black_material_info, black_piece_square_score)
-        black_pawn_shield_score = self._evaluate_king_pawn_shield(chess.BLACK, white_material_info, white_piece_square_score)
+        pawn_entry = self._probe_pawn_structure(board)
+
+        white_pawn_score = pawn_entry.pawn_scores[chess.WHITE]
+        black_pawn_score = pawn_entry.pawn_scores[chess.BLACK]
+
+        white_pawn_shield_score = self._evaluate_king_pawn_shield(chess.WHITE, pawn_entry, black_material_info, black_piece_square_score)
+        black_pawn_shield_score = self._evaluate_king_pawn_shield(chess.BLACK, pawn_entry, white_material_info, white_piece_square_score)
 
         white_mop_up_eval = self._mop_up_eval(chess.WHITE, white_material_info, black_material_info)
         black_mop_up_eval = self._mop_up_eval(chess.BLACK, black_material_info, white_material_info)
@@ -76,62 +98,18 @@ class Evaluation:
 
         return white_score - black_score
 
-    def _evaluate_piece_square_tables(self, colour: chess.Color, endgame_T: float):
-        score = 0
-        for piece_type in PieceTables:
-            if piece_type not in (PieceTables.PAWNS_START, PieceTables.PAWNS_ENDGAME,
-                                  PieceTables.KING_START, PieceTables.KING_ENDGAME):
-                score += self._evaluate_piece_positions(colour, piece_type)
-
-            # interpolate between early and late game
-            elif piece_type in (PieceTables.PAWNS_START, PieceTables.KING_START):
-                score += self._evaluate_game_state_piece_positions(colour, piece_type, True) * (1 - endgame_T)
-            else:
-                score += self._evaluate_game_state_piece_positions(colour, piece_type, False) * endgame_T
-
-        return int(score)
-
-    def _evaluate_piece_positions(self, colour: chess.Color, piece_type):
-        board = self.get_board()
-        colour_table = self.piece_square_tables.get_colour_tables(colour)
-
-        chess_piece = self.piece_type_mapping[piece_type]
-        table = colour_table[piece_type]
-
-        positions = board.pieces(chess_piece, colour)
-
-        score = 0
-        for square in positions:
-            score += table[56 ^ square]
-
-        return score
-
-    def _evaluate_game_state_piece_positions(self, colour: chess.Color, piece_type, early_game: bool):
-        board = self.get_board()
-        colour_table = self.piece_square_tables.get_colour_tables(colour)
-
-        if early_game:
-            if piece_type == PieceTables.PAWNS_START:
-                table = colour_table[PieceTables.PAWNS_START]
-                chess_piece = chess.PAWN
-            else:
-                table = colour_table[PieceTables.KING_START]
-                chess_piece = chess.KING
-        else:
-            if piece_type == PieceTables.PAWNS_ENDGAME:
-                table = colour_table[PieceTables.PAWNS_ENDGAME]
-                chess_piece = chess.PAWN
-            else:
-                table = colour_table[PieceTables.KING_ENDGAME]
-                chess_piece = chess.KING
-
-        positions = board.pieces(chess_piece, colour)
-
-        score = 0
-        for square in positions:
-            score += table[56 ^ square]
-
-        return score
+    @staticmethod
+    def _evaluate_piece_square_tables(state: EvaluationState, colour: chess.Color, endgame_T: float):
+        # interpolate between early and late game, only pawns and kings have separate endgame tables. summed in the
+        # same order as the tables themselves so the float result is unchanged
+        midgame_scores = state.midgame_scores[colour]
+        endgame_scores = state.endgame_scores[colour]
+        return int(
+            midgame_scores[chess.PAWN] * (1 - endgame_T) + endgame_scores[chess.PAWN] * endgame_T
+            + midgame_scores[chess.KNIGHT] + midgame_scores[chess.BISHOP] + midgame_scores[chess.ROOK]
+            + midgame_scores[chess.QUEEN]
+            + midgame_scores[chess.KING] * (1 - endgame_T) + endgame_scores[chess.KING] * endgame_T
+        )
 
     def _mop_up_eval(self, colour, friendly_material_info: "MaterialInfo", enemy_material_info: "MaterialInfo"):
         if friendly_material_info.material_score < enemy_material_info.material_score + self.PIECE_VALUES[
@@ -154,96 +132,78 @@ class Evaluation:
 
         return int(score * enemy_material_info.endgameT)
 
-    def _evaluate_pawns(self, colour: chess.Color):
-        board = self.get_board()
+    def _probe_pawn_structure(self, board: chess.Board):
+        # boards used by the search keep their pawn key up to date as moves are made
+        pawn_key = getattr(board, 'pawn_key', None)
+        if pawn_key is None:
+            pawn_key = Zobrist.hash_pawns(board)
 
-        score = 0
-        pawns = board.pieces(chess.PAWN, colour)
+        entry = self.pawn_table.probe(pawn_key)
+        if entry is None:
+            entry = self._evaluate_pawn_structure(board)
+            self.pawn_table.store(pawn_key, entry)
 
-        num_isolated_pawns = 0
+        return entry
 
-        for square in pawns:
-            if self._is_passed_pawn(square, colour):
+    def _evaluate_pawn_structure(self, board: chess.Board):
+        # everything here depends only on the pawns and kings, so it can be cached by the pawn key
+        pawns = board.pawns
+        pawn_scores = [0, 0]
+        king_on_wing = [False, False]
+        shield_penalties = [0, 0]
+        open_file_penalties = [0, 0]
 
-                if colour == chess.WHITE:
-                    score += self.PASSED_PAWN_BONUSES[7 - chess.square_rank(square)]
-                else:
-                    score += self.PASSED_PAWN_BONUSES[chess.square_rank(square)]
+        for colour in (chess.WHITE, chess.BLACK):
+            friendly_pawns = pawns & board.occupied_co[colour]
+            enemy_pawns = pawns & board.occupied_co[not colour]
 
-            if self._is_isolated_pawn(square, colour):
-                num_isolated_pawns += 1
-
-        score += self.ISOLATED_PAWN_PENALTY[num_isolated_pawns]
-        return score
-
-    def _is_isolated_pawn(self, pawn_square: chess.Square, colour: chess.Color):
-        board = self.get_board()
-
-        pawn_file = chess.square_file(pawn_square)
-
-        # assume isolated
-        is_isolated = True
-
-        # look in neighbouring files for friendly pawns
-        for file in [pawn_file - 1, pawn_file + 1]:
-            if file < 0 or file > 7:
-                continue
-
-            friendly_pawns = board.pieces(chess.PAWN, colour)
+            pawn_scores[colour] = self._evaluate_pawns(colour, friendly_pawns, enemy_pawns)
 
-            adjacent_pawns = friendly_pawns & chess.SquareSet(chess.BB_FILES[file])
+            king_square = board.king(colour)
+            king_file = chess.square_file(king_square)
 
-            if adjacent_pawns:
-                is_isolated = False
-                break
+            king_on_wing[colour] = king_file <= 2 or king_file >= 5
+            shield_penalties[colour] = self._penalty_for_shield(colour, king_square, friendly_pawns)
+            open_file_penalties[colour] = self._penalty_for_open_file(colour, king_square, pawns)
 
-        return is_isolated
+        return PawnEntry(pawn_scores, king_on_wing, shield_penalties, open_file_penalties)
 
-    def _is_passed_pawn(self, square: chess.Square, colour: chess.Color):
-        board = self.get_board()
-
-        enemy_colour = not colour
-
-        pawn_rank, pawn_file = chess.square_rank(square), chess.square_file(square)
-
-        # assume passed
-        is_passed = True
-
-        end_rank = 7 if colour == chess.WHITE else 0
-
-        rank_range = range(pawn_rank + 1, end_rank) if colour == chess.WHITE else range(pawn_rank - 1, end_rank, -1)
-
-        min_file = max(0, pawn_file - 1)
-        max_file = min(7, pawn_file + 1)
+    def _evaluate_pawns(self, colour: chess.Color, friendly_pawns, enemy_pawns):
+        score = 0
+        num_isolated_pawns = 0
 
-        for rank in rank_range:
-            for file in range(min_file, max_file):
+        passed_pawn_masks = self.evaluation_data.get_passed_pawn_masks(colour)
+        adjacent_file_masks = self.evaluation_data.adjacent_file_masks
 
-                target_square = chess.square(file, rank)
+        for square in chess.scan_forward(friendly_pawns):
+            if not enemy_pawns & passed_pawn_masks[square]:
+                if colour == chess.WHITE:
+                    score += self.PASSED_PAWN_BONUSES[7 - chess.square_rank(square)]
+                else:
+                    score += self.PASSED_PAWN_BONUSES[chess.square_rank(square)]
 
-                if board.piece_at(target_square) == chess.Piece(chess.PAWN, enemy_colour):
-                    is_passed = False
-                    break
+            if not friendly_pawns & adjacent_file_masks[chess.square_file(square)]:
+                num_isolated_pawns += 1
 
-            if not is_passed:
-                break
+        score += self.ISOLATED_PAWN_PENALTY[num_isolated_pawns]
 
-        return is_passed
+        for file_mask in chess.BB_FILES:
+            pawns_on_file = chess.popcount(friendly_pawns & file_mask)
+            if pawns_on_file > 1:
+                score += self.DOUBLED_PAWN_PENALTY * (pawns_on_file - 1)
 
-    def _evaluate_king_pawn_shield(self, colour: chess.Color, enemy_material_info: "MaterialInfo", enemy_piece_square_score):
-        board = self.get_board()
+        return score
 
+    def _evaluate_king_pawn_shield(self, colour: chess.Color, pawn_entry: PawnEntry,
+                                   enemy_material_info: "MaterialInfo", enemy_piece_square_score):
         if enemy_material_info.endgameT >= 1:
             return 0
 
         penalty = 0
         uncastled_king_penalty = 0
 
-        king_square = board.king(colour)
-        king_file = chess.square_file(king_square)
-
-        if king_file <= 2 or king_file >= 5:
-            penalty = self._penalty_for_shield(colour)
+        if pawn_entry.king_on_wing[colour]:
+            penalty = pawn_entry.shield_penalties[colour]
         else:
             enemy_development_score = max(
                 0, min(
@@ -260,7 +220,7 @@ class Evaluation:
         if number_enemy_rooks > 1 or (
             number_enemy_rooks == 0 and number_enemy_queens > 0
         ):
-            open_file_against_king_penalty = self._penalty_for_open_file(king_square)
+            open_file_against_king_penalty = pawn_entry.open_file_penalties[colour]
 
         pawn_shield_weight = 1 - enemy_material_info.endgameT
         if number_enemy_queens == 0:
@@ -268,19 +228,18 @@ class Evaluation:
 
         return int((-penalty - open_file_against_king_penalty - uncastled_king_penalty) * pawn_shield_weight)
 
-    def _penalty_for_open_file(self, king_square):
+    def _penalty_for_open_file(self, colour: chess.Color, king_square, pawns):
         king_file = chess.square_file(king_square)
         king_rank = chess.square_rank(king_square)
+        front_span_masks = self.evaluation_data.get_front_span_masks(colour)
         penalty = 0
 
         # king between file 1-6 only (edge files ignored)
         clamped_king_file = max(1, min(6, king_file))
 
+        # a file is open when no pawn of either side stands in front of the king on it
         for attack_file in range(clamped_king_file - 1, clamped_king_file + 2):
-            if all(
-                    not self.get_board().piece_at(chess.square(attack_file, rank))
-                    for rank in range(king_rank, 8)
-            ):
+            if not pawns & front_span_masks[chess.square(attack_file, king_rank)]:
                 if attack_file == king_file:
                     penalty += 25
                 else:
@@ -288,16 +247,13 @@ class Evaluation:
 
         return penalty
 
-    def _penalty_for_shield(self, colour: chess.Color):
-        board = self.get_board()
+    def _penalty_for_shield(self, colour: chess.Color, king_square, friendly_pawns):
         penalty = 0
 
-        king_square = board.king(colour)
-        friendly_pawn = chess.Piece(chess.PAWN, colour)
         shield_squares = self.evaluation_data.get_shield_squares(colour)[king_square]
 
         for i, square in enumerate(shield_squares):
-            if board.piece_at(square) != friendly_pawn:
+            if not friendly_pawns & chess.BB_SQUARES[square]:
                 penalty += (
                     self.KING_PAWN_SHIELD_SCORES[
                         min(i, len(self.KING_PAWN_SHIELD_SCORES) - 1)
@@ -309,54 +265,35 @@ class Evaluation:
         return penalty
 
 class MaterialInfo:
-    def __init__(self, board: chess.Board, colour: chess.Color):
-        self.board = board
+    PIECE_TYPES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+
+    def __init__(self, state: EvaluationState, colour: chess.Color):
         self.colour = colour
 
-        self.piece_names = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
-        self.num_friendly_pieces, self.num_enemy_pawns = self.get_pieces()
+        self.num_friendly_pieces, self.num_enemy_pawns = self.get_pieces(state)
 
         self.material_score = self.get_material_score()
 
         self.endgameT = self.get_endgame_t()
 
-    def get_pieces(self):
-
-        num_friendly_pieces = {}
-
-        for piece in self.piece_names:
-            num_friendly_pieces[piece] = get_count_of_pieces_of_colour(self.board, piece, self.colour)
-
-        num_enemy_pawns = get_count_of_pieces_of_colour(self.board, chess.PAWN, not self.colour)
+    def get_pieces(self, state: EvaluationState):
+        # the state's own counts indexed by piece type, read straight away rather than copied into a dict
+        num_friendly_pieces = state.piece_counts[self.colour]
+        num_enemy_pawns = state.piece_counts[not self.colour][chess.PAWN]
 
         return num_friendly_pieces, num_enemy_pawns
 
-
     def get_material_score(self):
         score = 0
-        for piece in self.piece_names:
+        for piece in self.PIECE_TYPES:
             score += self.num_friendly_pieces[piece] * Evaluation.PIECE_VALUES[piece]
 
         return score
 
     def get_endgame_t(self):
-        ENDGAME_PIECE_WEIGHTS = {
-            chess.QUEEN: 45,
-            chess.ROOK: 20,
-            chess.KNIGHT: 10,
-            chess.BISHOP: 10
-        }
-
-        STARTING_WEIGHT = (
-            2 * ENDGAME_PIECE_WEIGHTS[chess.ROOK] +
-            2 * ENDGAME_PIECE_WEIGHTS[chess.BISHOP] +
-            2 * ENDGAME_PIECE_WEIGHTS[chess.KNIGHT] +
-            1 * ENDGAME_PIECE_WEIGHTS[chess.QUEEN]
-        )
-
         CURRENT_WEIGHT = 0
-        for piece in ENDGAME_PIECE_WEIGHTS.keys():
-            CURRENT_WEIGHT += self.num_friendly_pieces[piece] * ENDGAME_PIECE_WEIGHTS[piece]
+        for piece, weight in Evaluation.ENDGAME_PIECE_WEIGHTS.items():
+            CURRENT_WEIGHT += self.num_friendly_pieces[piece] * weight
 
         #
-        return 1 - min(1, CURRENT_WEIGHT / STARTING_WEIGHT)
\ No newline at end of file
+        return 1 - min(1, CURRENT_WEIGHT / Evaluation.ENDGAME_STARTING_WEIGHT)
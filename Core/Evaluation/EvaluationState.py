@@ -0,0 +1,46 @@
+import chess
+
+from Core.Evaluation.PieceSquareTables import PieceSquareTables
+
+
+class EvaluationState:
+    # flat [colour][piece_type][square] tables shared by every state
+    MIDGAME_TABLES = None
+    ENDGAME_TABLES = None
+
+    def __init__(self):
+        self.get_tables()
+
+        # indexed [colour][piece_type], piece-square sums are kept per piece so they can be tapered one by one
+        self.piece_counts = [[0] * 7 for _ in range(2)]
+        self.midgame_scores = [[0] * 7 for _ in range(2)]
+        self.endgame_scores = [[0] * 7 for _ in range(2)]
+
+    @classmethod
+    def from_board(cls, board: chess.Board):
+        state = cls()
+
+        for colour in (chess.WHITE, chess.BLACK):
+            for square in chess.scan_forward(board.occupied_co[colour]):
+                state.add_piece(colour, board.piece_type_at(square), square)
+
+        return state
+
+    @classmethod
+    def get_tables(cls):
+        if EvaluationState.MIDGAME_TABLES is None:
+            piece_square_tables = PieceSquareTables()
+            EvaluationState.MIDGAME_TABLES = piece_square_tables.midgame_tables
+            EvaluationState.ENDGAME_TABLES = piece_square_tables.endgame_tables
+
+        return EvaluationState.MIDGAME_TABLES, EvaluationState.ENDGAME_TABLES
+
+    def add_piece(self, colour: chess.Color, piece_type: chess.PieceType, square: chess.Square):
+        self.piece_counts[colour][piece_type] += 1
+        self.midgame_scores[colour][piece_type] += self.MIDGAME_TABLES[colour][piece_type][square]
+        self.endgame_scores[colour][piece_type] += self.ENDGAME_TABLES[colour][piece_type][square]
+
+    def remove_piece(self, colour: chess.Color, piece_type: chess.PieceType, square: chess.Square):
+        self.piece_counts[colour][piece_type] -= 1
+        self.midgame_scores[colour][piece_type] -= self.MIDGAME_TABLES[colour][piece_type][square]
+        self.endgame_scores[colour][piece_type] -= self.ENDGAME_TABLES[colour][piece_type][square]
@@ -0,0 +1,42 @@
+class PawnEntry:
+    __slots__ = ('pawn_scores', 'king_on_wing', 'shield_penalties', 'open_file_penalties')
+
+    # each field is indexed by colour
+    def __init__(self, pawn_scores, king_on_wing, shield_penalties, open_file_penalties):
+        self.pawn_scores = pawn_scores
+        self.king_on_wing = king_on_wing
+        self.shield_penalties = shield_penalties
+        self.open_file_penalties = open_file_penalties
+
+
+class PawnHashTable:
+    DEFAULT_SIZE = 1 << 14
+
+    def __init__(self, size=DEFAULT_SIZE):
+        # round down to a power of two so the index is a mask of the key
+        size = 1 << (max(1, size).bit_length() - 1)
+
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+
+        self.misses += 1
+        return None
+
+    def store(self, key, entry: PawnEntry):
+        index = key & self.mask
+        self.keys[index] = key
+        self.entries[index] = entry
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0
@@ -101,6 +101,24 @@ class PieceSquareTables:
         -50, -30, -30, -30, -30, -30, -30, -50
     ]
 
+    MIDGAME_PIECE_TABLES = {
+        chess.PAWN: PieceTables.PAWNS_START,
+        chess.KNIGHT: PieceTables.KNIGHTS,
+        chess.BISHOP: PieceTables.BISHOPS,
+        chess.ROOK: PieceTables.ROOKS,
+        chess.QUEEN: PieceTables.QUEENS,
+        chess.KING: PieceTables.KING_START,
+    }
+
+    ENDGAME_PIECE_TABLES = {
+        chess.PAWN: PieceTables.PAWNS_ENDGAME,
+        chess.KNIGHT: PieceTables.KNIGHTS,
+        chess.BISHOP: PieceTables.BISHOPS,
+        chess.ROOK: PieceTables.ROOKS,
+        chess.QUEEN: PieceTables.QUEENS,
+        chess.KING: PieceTables.KING_ENDGAME,
+    }
+
     def __init__(self):
 
         self.white_tables = {
@@ -119,6 +137,10 @@ class PieceSquareTables:
         for piece, table in self.white_tables.items():
             self.black_tables[piece] = self.mirror_table(table)
 
+        # flat lookups indexed [colour][piece_type][square], already flipped to board square order
+        self.midgame_tables = self._build_flat_tables(self.MIDGAME_PIECE_TABLES)
+        self.endgame_tables = self._build_flat_tables(self.ENDGAME_PIECE_TABLES)
+
 
     # as tables are based on white perspective, need to mirror for blacks
     @staticmethod
@@ -136,6 +158,18 @@ class PieceSquareTables:
 
         return mirrored_table
 
+    def _build_flat_tables(self, piece_tables):
+        flat_tables = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+
+        for colour in (chess.WHITE, chess.BLACK):
+            colour_tables = self.get_colour_tables(colour)
+
+            # tables are laid out from rank 8 down, so flip the rank to index by square
+            for piece_type, piece_table in piece_tables.items():
+                flat_tables[colour][piece_type] = [colour_tables[piece_table][56 ^ square] for square in range(64)]
+
+        return flat_tables
+
     def print_mirrored_table_test(self, table):
         table = self.mirror_table(table)
 
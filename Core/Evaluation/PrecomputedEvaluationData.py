@@ -6,6 +6,13 @@ class PrecomputedEvaluationData:
         self.pawn_shield_squares_black = [[] for _ in range(64)]
         self._initialize_pawn_shields()
 
+        self.adjacent_file_masks = [0] * 8
+        self.front_span_masks_white = [0] * 64
+        self.front_span_masks_black = [0] * 64
+        self.passed_pawn_masks_white = [0] * 64
+        self.passed_pawn_masks_black = [0] * 64
+        self._initialize_pawn_masks()
+
     def _initialize_pawn_shields(self):
         for square_index in range(64):
             self._create_pawn_shield_square(square_index)
@@ -30,6 +37,34 @@ class PrecomputedEvaluationData:
         self.pawn_shield_squares_white[square_index] = shield_indices_white
         self.pawn_shield_squares_black[square_index] = shield_indices_black
 
+    def _initialize_pawn_masks(self):
+        for file in range(8):
+            if file > 0:
+                self.adjacent_file_masks[file] |= chess.BB_FILES[file - 1]
+            if file < 7:
+                self.adjacent_file_masks[file] |= chess.BB_FILES[file + 1]
+
+        for square_index in range(64):
+            file = chess.square_file(square_index)
+            rank = chess.square_rank(square_index)
+
+            ranks_ahead_white = 0
+            for ahead_rank in range(rank + 1, 8):
+                ranks_ahead_white |= chess.BB_RANKS[ahead_rank]
+
+            ranks_ahead_black = 0
+            for ahead_rank in range(rank):
+                ranks_ahead_black |= chess.BB_RANKS[ahead_rank]
+
+            # every square on the same file strictly ahead of the square, from each side's view
+            self.front_span_masks_white[square_index] = chess.BB_FILES[file] & ranks_ahead_white
+            self.front_span_masks_black[square_index] = chess.BB_FILES[file] & ranks_ahead_black
+
+            # a pawn is passed when no enemy pawn is ahead of it on its own or a neighbouring file
+            span_files = chess.BB_FILES[file] | self.adjacent_file_masks[file]
+            self.passed_pawn_masks_white[square_index] = span_files & ranks_ahead_white
+            self.passed_pawn_masks_black[square_index] = span_files & ranks_ahead_black
+
     @staticmethod
     def _add_if_valid(square, list_):
         if 0 <= chess.square_rank(square) < 8:
@@ -39,4 +74,16 @@ class PrecomputedEvaluationData:
         if colour == chess.WHITE:
             return self.pawn_shield_squares_white
         else:
-            return self.pawn_shield_squares_black
\ No newline at end of file
+            return self.pawn_shield_squares_black
+
+    def get_front_span_masks(self, colour: chess.Color):
+        if colour == chess.WHITE:
+            return self.front_span_masks_white
+        else:
+            return self.front_span_masks_black
+
+    def get_passed_pawn_masks(self, colour: chess.Color):
+        if colour == chess.WHITE:
+            return self.passed_pawn_masks_white
+        else:
+            return self.passed_pawn_masks_black
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import queue
+import time
+
+import chess
+
+from Core.Search.Search import Search
+from Core.Search.SharedTranspositionTable import SharedTranspositionTable
+from Core.Search.Tablebase import create_tablebase
+from Core.Search.TranspositionTable import TranspositionTable
+
+
+def _replay(root_fen, moves, chess960):
+    board = chess.Board(root_fen, chess960=chess960)
+    for move in moves:
+        board.push(chess.Move.from_uci(move))
+
+    return board
+
+
+def _helper_loop(worker_id, table_name, num_buckets, task_queue, result_queue, stop_event, search_options):
+    trans_table = SharedTranspositionTable.attach(table_name, num_buckets)
+
+    # helpers only probe local tablebases, never the http api
+    search = Search(trans_table=trans_table, tablebase=create_tablebase(http_fallback=False), **search_options)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        search_id, root_fen, moves, chess960, max_depth, limits, age = task
+        board = _replay(root_fen, moves, chess960)
+
+        # the age lives in each process, take the main search's so entries from every process age together.
+        # the search moves it on by one as it starts, the same as the main search's does
+        trans_table.age = age
+
+        # odd helpers start a ply deeper so the processes spread over different depths
+        best_move, evaluation = search.search(
+            board, max_depth, start_depth=1 + worker_id % 2, stop_event=stop_event, **limits
+        )
+
+        result_queue.put((
+            search_id, worker_id, search.completed_depth, best_move and best_move.uci(), evaluation,
+            search.nodes_searched + search.q_nodes_searched,
+        ))
+
+    trans_table.close()
+
+
+# lazy smp, helper processes search the same root through a shared transposition table
+# and the main process keeps the deepest completed result
+class LazySMP:
+    # how long stopped helpers get to report before the main search's result is used without them
+    HELPER_RESULT_TIMEOUT = 5.0
+    # seconds between checks that the helpers still being waited for are alive
+    HELPER_POLL_INTERVAL = 0.1
+
+    def __init__(self, num_workers=None, time_limit=None, hash_size_mb=TranspositionTable.DEFAULT_SIZE_MB,
+                 tablebase=None, **search_options):
+        self.num_workers = num_workers or os.cpu_count() or 1
+
+        self.trans_table = SharedTranspositionTable(hash_size_mb)
+        self.main_search = Search(time_limit, tablebase=tablebase, trans_table=self.trans_table, **search_options)
+
+        self.stop_event = multiprocessing.Event()
+        self.result_queue = multiprocessing.Queue()
+        # worker id -> (process, task queue)
+        self.helpers = {}
+
+        for worker_id in range(1, self.num_workers):
+            task_queue = multiprocessing.Queue()
+            helper = multiprocessing.Process(
+                target=_helper_loop,
+                args=(
+                    worker_id, self.trans_table.shared_memory.name, self.trans_table.num_buckets,
+                    task_queue, self.result_queue, self.stop_event, search_options,
+                ),
+                daemon=True,
+            )
+            helper.start()
+
+            self.helpers[worker_id] = (helper, task_queue)
+
+        # results are tagged with the search they belong to, so a late one is never taken for the next search's
+        self.search_id = 0
+
+        self.nodes_searched = 0
+        self.completed_depth = 0
+
+    def search(self, board, max_depth=3, info_callback=None, stop_event=None, **limits):
+        # the callback and stop event belong to the main search, helpers are stopped through their own event
+        root = board.root()
+        self.search_id += 1
+        task = (
+            self.search_id, root.fen(), [move.uci() for move in board.move_stack], board.chess960, max_depth, limits,
+            self.trans_table.age,
+        )
+        for _, task_queue in self.helpers.values():
+            task_queue.put(task)
+
+        best_move, evaluation = self.main_search.search(
+            board, max_depth, info_callback=info_callback, stop_event=stop_event, **limits
+        )
+        completed_depth = self.main_search.completed_depth
+        self.nodes_searched = self.main_search.nodes_searched + self.main_search.q_nodes_searched
+
+        # the main search is done, helpers stop at their next check and report their last completed iteration
+        self.stop_event.set()
+        for helper_depth, helper_move, helper_evaluation, helper_nodes in self._collect_helper_results():
+            self.nodes_searched += helper_nodes
+
+            if helper_depth > completed_depth and helper_move is not None:
+                best_move, evaluation = chess.Move.from_uci(helper_move), helper_evaluation
+                completed_depth = helper_depth
+
+        self.stop_event.clear()
+        self.completed_depth = completed_depth
+
+        return best_move, evaluation
+
+    def _collect_helper_results(self):
+        # a helper that died, or doesn't answer in time, is left out rather than waited on forever
+        waiting = {worker_id: helper for worker_id, (helper, _) in self.helpers.items()}
+        deadline = time.perf_counter() + self.HELPER_RESULT_TIMEOUT
+
+        while waiting:
+            try:
+                search_id, worker_id, *result = self.result_queue.get(timeout=self.HELPER_POLL_INTERVAL)
+            except queue.Empty:
+                for worker_id, helper in list(waiting.items()):
+                    if not helper.is_alive():
+                        print(f"Search helper {worker_id} exited with code {helper.exitcode}")
+                        del waiting[worker_id]
+
+                if time.perf_counter() >= deadline:
+                    break
+                continue
+
+            if search_id == self.search_id and waiting.pop(worker_id, None) is not None:
+                yield result
+
+        # dead helpers get no more tasks, the rest carry on without them
+        self.helpers = {
+            worker_id: (helper, task_queue) for worker_id, (helper, task_queue) in self.helpers.items()
+            if helper.is_alive()
+        }
+
+    def new_game(self):
+        # only safe between searches
+        self.trans_table.clear()
+        self.main_search.new_game()
+
+    def close(self):
+        for _, task_queue in self.helpers.values():
+            task_queue.put(None)
+
+        for helper, _ in self.helpers.values():
+            helper.join(self.HELPER_RESULT_TIMEOUT)
+            if helper.is_alive():
+                helper.terminate()
+
+        self.helpers = {}
+        self.trans_table.close()
@@ -0,0 +1,145 @@
+import chess
+
+from Core.Search.Position import Position
+
+
+# hands out moves a stage at a time so a cutoff early on never pays for generating or scoring the rest.
+# moves are Position's 16 bit ints
+class MovePicker:
+    HASH_MOVE, TACTICAL_MOVES, KILLER_MOVES, QUIET_MOVES, LOSING_CAPTURES = range(5)
+
+    PIECE_VALUES = Position.SEE_VALUES
+
+    def __init__(self, board: Position, hash_move=None, killers=(), countermove=None, history=None):
+        self.board = board
+        self.hash_move = hash_move
+        # killers and the countermove share a stage, tried in that order
+        self.killers = (*killers, countermove)
+        # scores for the side to move indexed by the move's from and to squares
+        self.history = history
+
+        self.stage = self.HASH_MOVE
+
+    def __iter__(self):
+        board = self.board
+        hash_move = self.hash_move
+
+        # the hash move may come from a different position sharing the key
+        if hash_move is not None and board.is_legal(hash_move):
+            yield hash_move
+        else:
+            hash_move = None
+
+        # captures that lose material in the exchange are worse bets than most quiet moves, they wait until last
+        self.stage = self.TACTICAL_MOVES
+        losing_captures = []
+        for move in self.tactical_moves(board):
+            if move == hash_move:
+                continue
+
+            if self.is_losing_capture(board, move):
+                losing_captures.append(move)
+            else:
+                yield move
+
+        self.stage = self.KILLER_MOVES
+        killers = []
+        for killer in self.killers:
+            if killer is not None and killer != hash_move and killer not in killers \
+                    and not self.is_tactical(board, killer) and board.is_legal(killer):
+                killers.append(killer)
+                yield killer
+
+        self.stage = self.QUIET_MOVES
+        quiet_moves = [
+            move for move in self.quiet_moves(board)
+            if move != hash_move and move not in killers
+        ]
+
+        history = self.history
+        if history is not None:
+            quiet_moves.sort(key=lambda move: history[move & Position.FROM_TO_MASK], reverse=True)
+
+        yield from quiet_moves
+
+        self.stage = self.LOSING_CAPTURES
+        yield from losing_captures
+
+    @classmethod
+    def is_losing_capture(cls, board: Position, move):
+        # taking something at least as valuable as the capturing piece can't lose material, only the rest need
+        # the exchange played out
+        if move >> Position.PROMOTION_SHIFT:
+            return False
+
+        mailbox = board.mailbox
+        if cls.PIECE_VALUES[mailbox[(move >> Position.TO_SHIFT) & Position.SQUARE_MASK]] \
+                >= cls.PIECE_VALUES[mailbox[move & Position.SQUARE_MASK]]:
+            return False
+
+        return board.static_exchange(move) < 0
+
+    @staticmethod
+    def is_tactical(board: Position, move):
+        # queen promotions and captures that don't underpromote
+        promotion = move >> Position.PROMOTION_SHIFT
+        if promotion:
+            return promotion == chess.QUEEN
+
+        return board.is_capture(move)
+
+    @staticmethod
+    def quiet_moves(board: Position):
+        # everything tactical_moves leaves out: moves to empty squares other than en passant and queen promotions,
+        # and captures that underpromote
+        moves = [
+            move for move in board.generate_legal_moves(chess.BB_ALL, ~board.occupied & chess.BB_ALL)
+            if move >> Position.PROMOTION_SHIFT != chess.QUEEN
+        ]
+
+        if board.ep_square is not None:
+            moves = [move for move in moves if not board.is_en_passant(move)]
+
+        promoting_pawns = board.pawns & board.occupied_co[board.turn] \
+            & (chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2)
+        if promoting_pawns:
+            moves.extend(
+                move for move in board.generate_legal_moves(promoting_pawns, board.occupied_co[not board.turn])
+                if move >> Position.PROMOTION_SHIFT != chess.QUEEN
+            )
+
+        return moves
+
+    @classmethod
+    def tactical_moves(cls, board: Position):
+        values = cls.PIECE_VALUES
+        mailbox = board.mailbox
+        own_pawns = board.pawns & board.occupied_co[board.turn]
+
+        moves = [
+            move for move in board.generate_legal_captures()
+            if move >> Position.PROMOTION_SHIFT in (0, chess.QUEEN)
+        ]
+        moves.extend(
+            move for move in board.generate_legal_moves(own_pawns, chess.BB_BACKRANKS & ~board.occupied)
+            if move >> Position.PROMOTION_SHIFT == chess.QUEEN
+        )
+
+        move_scores = []
+        for move in moves:
+            # MVV - LVA (most valuable victim attacked by least valuable attacker)
+            promotion = move >> Position.PROMOTION_SHIFT
+            victim_type = mailbox[(move >> Position.TO_SHIFT) & Position.SQUARE_MASK]
+            if not victim_type and not promotion:
+                victim_type = chess.PAWN  # en passant
+
+            score = -values[mailbox[move & Position.SQUARE_MASK]]
+            if victim_type:
+                score += 10 * values[victim_type]
+            if promotion:
+                score += 10 * values[chess.QUEEN]
+
+            move_scores.append((score, move))
+
+        move_scores.sort(reverse=True, key=lambda x: x[0])
+        return [move for score, move in move_scores]
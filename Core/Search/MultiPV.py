@@ -0,0 +1,180 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import chess
+
+from Core.Search.MovePicker import MovePicker
+from Core.Search.Position import Position
+from Core.Search.Search import Search
+from Core.Search.Tablebase import create_tablebase
+
+# each pool process keeps one search, with its own evaluation and transposition table, for its whole life
+_worker_search = None
+# shared by the whole pool and only inheritable at process start: the parent's stop event, and the queue workers
+# report each completed depth on
+_worker_stop_event = None
+_worker_progress_queue = None
+
+
+def _init_worker(search_options, stop_event, progress_queue):
+    global _worker_search, _worker_stop_event, _worker_progress_queue
+    _worker_search = Search(tablebase=create_tablebase(http_fallback=False), **search_options)
+    _worker_stop_event = stop_event
+    _worker_progress_queue = progress_queue
+
+
+def _search_root_moves(analysis_id, split_index, root_fen, moves, chess960, root_moves, max_depth, limits):
+    board = chess.Board(root_fen, chess960=chess960)
+    for move in moves:
+        board.push(chess.Move.from_uci(move))
+
+    # every depth's info goes back with the result too, the queue is only there to report progress early
+    iterations = []
+
+    def report(info):
+        iterations.append(info)
+        _worker_progress_queue.put((analysis_id, split_index, info))
+
+    _worker_search.search_moves(
+        board, [chess.Move.from_uci(move) for move in root_moves], max_depth, stop_event=_worker_stop_event,
+        info_callback=report, **limits
+    )
+
+    return iterations, _worker_search.nodes_searched + _worker_search.q_nodes_searched
+
+
+# multi pv analysis, root moves are split across a process pool that is kept between calls
+class MultiPV:
+    # seconds between looks at the caller's stop event and the workers' progress while the pool searches
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, num_workers=None, **search_options):
+        self.num_workers = num_workers or os.cpu_count() or 1
+
+        self.stop_event = multiprocessing.Event()
+        self.progress_queue = multiprocessing.Queue()
+        self.executor = ProcessPoolExecutor(
+            self.num_workers, initializer=_init_worker,
+            initargs=(search_options, self.stop_event, self.progress_queue),
+        )
+        # the stop event and progress queue are shared by the whole pool, so one analysis runs at a time. progress
+        # left over from an earlier one is told apart by its id
+        self.lock = threading.Lock()
+        self.analysis_id = 0
+
+        self.nodes_searched = 0
+        self.completed_depth = 0
+
+    def analyse(self, board: chess.Board, num_pvs=3, max_depth=3, info_callback=None, stop_event=None, **limits):
+        # returns up to num_pvs (move, evaluation, principal variation) best first, evaluations from white's
+        # perspective. info_callback gets the best line's info, with the top lines under 'lines', as every worker
+        # completes a depth
+        root_moves = [Position.decode_move(move) for move in MovePicker(Position.from_board(board))]
+        if not root_moves:
+            return []
+
+        # deal the ordered moves out in turn so every worker gets a share of the promising ones
+        num_splits = min(self.num_workers, len(root_moves))
+        splits = [root_moves[index::num_splits] for index in range(num_splits)]
+
+        root = board.root()
+        history = [move.uci() for move in board.move_stack]
+        perspective = 1 if board.turn == chess.WHITE else -1
+
+        with self.lock:
+            self.analysis_id += 1
+            futures = [
+                self.executor.submit(
+                    _search_root_moves, self.analysis_id, index, root.fen(), history, board.chess960,
+                    [move.uci() for move in split], max_depth, limits,
+                )
+                for index, split in enumerate(splits)
+            ]
+
+            # depth -> split index -> that split's info, a depth is reported once every split has completed it
+            reported = {}
+            reported_depth = 0
+
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, self.POLL_INTERVAL, FIRST_COMPLETED)
+                if stop_event is not None and stop_event.is_set():
+                    self.stop_event.set()
+
+                for split_index, info in self._drain_progress():
+                    reported.setdefault(info['depth'], {})[split_index] = info
+
+                while len(reported.get(reported_depth + 1, ())) == num_splits:
+                    reported_depth += 1
+                    depth_infos = reported.pop(reported_depth)
+                    if info_callback is not None:
+                        info_callback(self._merge(
+                            [depth_infos[index] for index in range(num_splits)], num_pvs, perspective
+                        ))
+
+            self.stop_event.clear()
+
+            split_iterations = []
+            self.nodes_searched = 0
+            for future in futures:
+                iterations, nodes = future.result()
+                split_iterations.append(iterations)
+                self.nodes_searched += nodes
+
+        # the deepest depth every split completed, progress that didn't make it through the queue in time is
+        # reported from the results
+        self.completed_depth = min(len(iterations) for iterations in split_iterations)
+        if info_callback is not None:
+            for depth in range(reported_depth + 1, self.completed_depth + 1):
+                info_callback(self._merge(
+                    [iterations[depth - 1] for iterations in split_iterations], num_pvs, perspective
+                ))
+
+        if self.completed_depth:
+            infos = [iterations[self.completed_depth - 1] for iterations in split_iterations]
+        else:
+            # stopped before every split finished a depth, whatever the others got is better than nothing
+            infos = [iterations[-1] for iterations in split_iterations if iterations]
+
+        return self._merge(infos, num_pvs, perspective)['lines'] if infos else []
+
+    def _drain_progress(self):
+        while True:
+            try:
+                analysis_id, split_index, info = self.progress_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if analysis_id == self.analysis_id:
+                yield split_index, info
+
+    @staticmethod
+    def _merge(infos, num_pvs, perspective):
+        # one info for the whole root out of the splits' infos at the same depth
+        lines = sorted(
+            (line for info in infos for line in info['lines']), key=lambda line: line[1] * perspective, reverse=True
+        )[:num_pvs]
+        _, evaluation, principal_variation = lines[0]
+        score = evaluation * perspective
+
+        nodes = sum(info['nodes'] for info in infos)
+        elapsed = max(info['time'] for info in infos)
+
+        return {
+            'depth': infos[0]['depth'],
+            'seldepth': max(info['seldepth'] for info in infos),
+            'score': score,
+            'mate': Search.mate_in(score),
+            'nodes': nodes,
+            'nps': int(nodes / elapsed) if elapsed > 0 else 0,
+            'time': elapsed,
+            'hashfull': max(info['hashfull'] for info in infos),
+            'pv': principal_variation,
+            'lines': lines,
+        }
+
+    def close(self):
+        self.executor.shutdown()
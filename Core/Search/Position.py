@@ -0,0 +1,751 @@
+import chess
+
+from Core.Evaluation.EvaluationState import EvaluationState
+from Core.Search.Zobrist import Zobrist
+
+
+# the search's own board: bitboards and a mailbox in plain ints, moves as 16 bit ints and make/unmake through an
+# undo stack. chess.Board and fens are only used to get positions in and out
+class Position:
+    __slots__ = (
+        'piece_bbs', 'occupied_co', 'occupied', 'mailbox', 'turn', 'castling_rights', 'ep_square',
+        'halfmove_clock', 'fullmove_number', 'zobrist_key', 'pawn_key', 'eval_state', 'move_stack', 'root_fen',
+        '_undo_stack', '_key_stack', '_in_check',
+    )
+
+    # a move is from_square | to_square << 6 | promotion piece type << 12, the same layout the transposition table
+    # stores. castling is the king's two square move, and 0 (a1a1) is the null move
+    TO_SHIFT = 6
+    PROMOTION_SHIFT = 12
+    SQUARE_MASK = 0x3F
+    # from and to squares only, what history and countermove tables are indexed by
+    FROM_TO_MASK = 0xFFF
+    NULL_MOVE = 0
+
+    PROMOTION_TYPES = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)
+
+    # indexed by piece type, what static exchange and the move ordering count material in
+    SEE_VALUES = (0, 100, 300, 320, 500, 900, 20000)
+
+    BB_SQUARES = chess.BB_SQUARES
+    BB_KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+    BB_KING_ATTACKS = chess.BB_KING_ATTACKS
+    BB_PAWN_ATTACKS = chess.BB_PAWN_ATTACKS
+    BB_DIAG_MASKS = chess.BB_DIAG_MASKS
+    BB_DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+    BB_FILE_MASKS = chess.BB_FILE_MASKS
+    BB_FILE_ATTACKS = chess.BB_FILE_ATTACKS
+    BB_RANK_MASKS = chess.BB_RANK_MASKS
+    BB_RANK_ATTACKS = chess.BB_RANK_ATTACKS
+    # BB_RAYS[a][b] is the whole line through both squares, BB_BETWEEN[a][b] only the squares strictly between
+    BB_RAYS = chess.BB_RAYS
+    BB_BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+
+    # (rook from, rook to) for a king moving two squares to the given square
+    CASTLING_ROOKS = {
+        chess.G1: (chess.H1, chess.F1),
+        chess.C1: (chess.A1, chess.D1),
+        chess.G8: (chess.H8, chess.F8),
+        chess.C8: (chess.A8, chess.D8),
+    }
+
+    def __init__(self, fen=chess.STARTING_FEN):
+        self.set_board(chess.Board(fen))
+
+    @classmethod
+    def from_board(cls, board: chess.Board):
+        if board.chess960:
+            raise ValueError("chess960 positions are not supported")
+
+        # replay the game so the key history covers repetitions from before the search
+        position = cls.__new__(cls)
+        position.set_board(board.root())
+        for move in board.move_stack:
+            position.push(cls.encode_move(move))
+
+        return position
+
+    def set_board(self, board: chess.Board):
+        self.piece_bbs = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.mailbox = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+
+        self.zobrist_key = Zobrist.hash_board(board)
+        self.pawn_key = Zobrist.hash_pawns(board)
+        self.eval_state = EvaluationState.from_board(board)
+
+        self.root_fen = board.fen()
+        self.move_stack = []
+        self._undo_stack = []
+        self._key_stack = []
+
+        # worked out the first time it is asked for, the search asks several times per node
+        self._in_check = None
+
+    def to_board(self):
+        # the current position only, without the moves that led to it
+        board = chess.Board(None)
+
+        board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings = self.piece_bbs[1:]
+        board.occupied_co = [self.occupied_co[chess.BLACK], self.occupied_co[chess.WHITE]]
+        board.occupied = self.occupied
+        board.promoted = 0
+
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+
+        return board
+
+    def fen(self):
+        return self.to_board().fen()
+
+    @classmethod
+    def encode_move(cls, move: chess.Move):
+        return move.from_square | move.to_square << cls.TO_SHIFT | (move.promotion or 0) << cls.PROMOTION_SHIFT
+
+    @classmethod
+    def decode_move(cls, move):
+        return chess.Move(
+            move & cls.SQUARE_MASK, (move >> cls.TO_SHIFT) & cls.SQUARE_MASK, (move >> cls.PROMOTION_SHIFT) or None
+        )
+
+    def uci(self, move):
+        return self.decode_move(move).uci()
+
+    @property
+    def pawns(self):
+        return self.piece_bbs[chess.PAWN]
+
+    @property
+    def knights(self):
+        return self.piece_bbs[chess.KNIGHT]
+
+    @property
+    def bishops(self):
+        return self.piece_bbs[chess.BISHOP]
+
+    @property
+    def rooks(self):
+        return self.piece_bbs[chess.ROOK]
+
+    @property
+    def queens(self):
+        return self.piece_bbs[chess.QUEEN]
+
+    @property
+    def kings(self):
+        return self.piece_bbs[chess.KING]
+
+    def piece_type_at(self, square):
+        return self.mailbox[square] or None
+
+    def king(self, colour):
+        king_mask = self.piece_bbs[chess.KING] & self.occupied_co[colour]
+        return king_mask.bit_length() - 1 if king_mask else None
+
+    def push(self, move):
+        turn = self.turn
+        them = not turn
+        mailbox = self.mailbox
+        piece_bbs = self.piece_bbs
+        occupied_co = self.occupied_co
+        piece_square = Zobrist.PIECE_SQUARE
+
+        key = self.zobrist_key ^ Zobrist.WHITE_TO_MOVE
+        pawn_key = self.pawn_key
+        ep_square = self.ep_square
+        if ep_square is not None and piece_bbs[chess.PAWN] & occupied_co[turn] & self.BB_PAWN_ATTACKS[them][ep_square]:
+            key ^= Zobrist.EN_PASSANT_FILE[ep_square & 7]
+
+        from_square = move & 0x3F
+        to_square = (move >> 6) & 0x3F
+        captured = mailbox[to_square] if move else 0
+
+        self._undo_stack.append((captured, self.castling_rights, ep_square, self.halfmove_clock, self._in_check))
+        self._key_stack.append((self.zobrist_key, self.pawn_key))
+        self.move_stack.append(move)
+
+        self._in_check = None
+        self.halfmove_clock += 1
+        if turn == chess.BLACK:
+            self.fullmove_number += 1
+
+        self.turn = them
+        self.ep_square = None
+
+        if not move:
+            self.zobrist_key = key
+            return
+
+        eval_state = self.eval_state
+        piece = mailbox[from_square]
+        placed = move >> 12 or piece
+        from_mask = self.BB_SQUARES[from_square]
+        to_mask = self.BB_SQUARES[to_square]
+
+        if captured:
+            piece_bbs[captured] ^= to_mask
+            occupied_co[them] ^= to_mask
+            square_key = piece_square[them][captured][to_square]
+            key ^= square_key
+            if captured == chess.PAWN:
+                pawn_key ^= square_key
+            eval_state.remove_piece(them, captured, to_square)
+            self.halfmove_clock = 0
+
+        piece_bbs[piece] ^= from_mask
+        piece_bbs[placed] |= to_mask
+        occupied_co[turn] ^= from_mask | to_mask
+        mailbox[from_square] = 0
+        mailbox[to_square] = placed
+
+        from_key = piece_square[turn][piece][from_square]
+        to_key = piece_square[turn][placed][to_square]
+        key ^= from_key ^ to_key
+        if piece == chess.PAWN or piece == chess.KING:
+            pawn_key ^= from_key
+        if placed == chess.PAWN or placed == chess.KING:
+            pawn_key ^= to_key
+        eval_state.remove_piece(turn, piece, from_square)
+        eval_state.add_piece(turn, placed, to_square)
+
+        if piece == chess.PAWN:
+            self.halfmove_clock = 0
+            difference = to_square - from_square
+
+            if difference == 16 or difference == -16:
+                self.ep_square = ep_square = from_square + difference // 2
+                if piece_bbs[chess.PAWN] & occupied_co[them] & self.BB_PAWN_ATTACKS[turn][ep_square]:
+                    key ^= Zobrist.EN_PASSANT_FILE[ep_square & 7]
+
+            elif to_square == ep_square and not captured:
+                capture_square = to_square - 8 if turn == chess.WHITE else to_square + 8
+                capture_mask = self.BB_SQUARES[capture_square]
+                piece_bbs[chess.PAWN] ^= capture_mask
+                occupied_co[them] ^= capture_mask
+                mailbox[capture_square] = 0
+                square_key = piece_square[them][chess.PAWN][capture_square]
+                key ^= square_key
+                pawn_key ^= square_key
+                eval_state.remove_piece(them, chess.PAWN, capture_square)
+
+        elif piece == chess.KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            rook_from, rook_to = self.CASTLING_ROOKS[to_square]
+            rook_mask = self.BB_SQUARES[rook_from] | self.BB_SQUARES[rook_to]
+            piece_bbs[chess.ROOK] ^= rook_mask
+            occupied_co[turn] ^= rook_mask
+            mailbox[rook_from] = 0
+            mailbox[rook_to] = chess.ROOK
+            key ^= piece_square[turn][chess.ROOK][rook_from] ^ piece_square[turn][chess.ROOK][rook_to]
+            eval_state.remove_piece(turn, chess.ROOK, rook_from)
+            eval_state.add_piece(turn, chess.ROOK, rook_to)
+
+        # moving from or to a corner loses that corner's right, moving the king loses both
+        castling_rights = self.castling_rights
+        if castling_rights:
+            new_rights = castling_rights & ~(from_mask | to_mask)
+            if piece == chess.KING:
+                new_rights &= ~(chess.BB_RANK_1 if turn == chess.WHITE else chess.BB_RANK_8)
+
+            if new_rights != castling_rights:
+                key ^= Zobrist.hash_castling(castling_rights) ^ Zobrist.hash_castling(new_rights)
+                self.castling_rights = new_rights
+
+        self.occupied = occupied_co[chess.WHITE] | occupied_co[chess.BLACK]
+        self.zobrist_key = key
+        self.pawn_key = pawn_key
+
+    def pop(self):
+        move = self.move_stack.pop()
+        captured, self.castling_rights, ep_square, self.halfmove_clock, self._in_check = self._undo_stack.pop()
+        self.zobrist_key, self.pawn_key = self._key_stack.pop()
+        self.ep_square = ep_square
+
+        self.turn = turn = not self.turn
+        them = not turn
+        if turn == chess.BLACK:
+            self.fullmove_number -= 1
+
+        if not move:
+            return move
+
+        mailbox = self.mailbox
+        piece_bbs = self.piece_bbs
+        occupied_co = self.occupied_co
+        eval_state = self.eval_state
+
+        from_square = move & 0x3F
+        to_square = (move >> 6) & 0x3F
+        from_mask = self.BB_SQUARES[from_square]
+        to_mask = self.BB_SQUARES[to_square]
+
+        placed = mailbox[to_square]
+        piece = chess.PAWN if move >> 12 else placed
+
+        piece_bbs[placed] ^= to_mask
+        piece_bbs[piece] |= from_mask
+        occupied_co[turn] ^= from_mask | to_mask
+        mailbox[to_square] = captured
+        mailbox[from_square] = piece
+        eval_state.remove_piece(turn, placed, to_square)
+        eval_state.add_piece(turn, piece, from_square)
+
+        if captured:
+            piece_bbs[captured] |= to_mask
+            occupied_co[them] |= to_mask
+            eval_state.add_piece(them, captured, to_square)
+
+        elif piece == chess.PAWN and to_square == ep_square:
+            capture_square = to_square - 8 if turn == chess.WHITE else to_square + 8
+            capture_mask = self.BB_SQUARES[capture_square]
+            piece_bbs[chess.PAWN] |= capture_mask
+            occupied_co[them] |= capture_mask
+            mailbox[capture_square] = chess.PAWN
+            eval_state.add_piece(them, chess.PAWN, capture_square)
+
+        elif piece == chess.KING and (to_square - from_square == 2 or from_square - to_square == 2):
+            rook_from, rook_to = self.CASTLING_ROOKS[to_square]
+            rook_mask = self.BB_SQUARES[rook_from] | self.BB_SQUARES[rook_to]
+            piece_bbs[chess.ROOK] ^= rook_mask
+            occupied_co[turn] ^= rook_mask
+            mailbox[rook_to] = 0
+            mailbox[rook_from] = chess.ROOK
+            eval_state.remove_piece(turn, chess.ROOK, rook_to)
+            eval_state.add_piece(turn, chess.ROOK, rook_from)
+
+        self.occupied = occupied_co[chess.WHITE] | occupied_co[chess.BLACK]
+
+        return move
+
+    def attackers_mask(self, colour, square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+
+        piece_bbs = self.piece_bbs
+        queens = piece_bbs[chess.QUEEN]
+        rooks_and_queens = piece_bbs[chess.ROOK] | queens
+        bishops_and_queens = piece_bbs[chess.BISHOP] | queens
+
+        attackers = (
+            (self.BB_KNIGHT_ATTACKS[square] & piece_bbs[chess.KNIGHT])
+            | (self.BB_KING_ATTACKS[square] & piece_bbs[chess.KING])
+            | (self.BB_PAWN_ATTACKS[not colour][square] & piece_bbs[chess.PAWN])
+            | (self.BB_RANK_ATTACKS[square][self.BB_RANK_MASKS[square] & occupied] & rooks_and_queens)
+            | (self.BB_FILE_ATTACKS[square][self.BB_FILE_MASKS[square] & occupied] & rooks_and_queens)
+            | (self.BB_DIAG_ATTACKS[square][self.BB_DIAG_MASKS[square] & occupied] & bishops_and_queens)
+        )
+
+        return attackers & self.occupied_co[colour] & occupied
+
+    def is_attacked_by(self, colour, square):
+        return bool(self.attackers_mask(colour, square))
+
+    def is_check(self):
+        in_check = self._in_check
+        if in_check is None:
+            king_mask = self.piece_bbs[chess.KING] & self.occupied_co[self.turn]
+            in_check = self._in_check = bool(king_mask) and bool(
+                self.attackers_mask(not self.turn, king_mask.bit_length() - 1)
+            )
+
+        return in_check
+
+    def _slider_blockers(self, king):
+        # own pieces that are the only thing between the king and an enemy slider
+        piece_bbs = self.piece_bbs
+        queens = piece_bbs[chess.QUEEN]
+        rooks_and_queens = piece_bbs[chess.ROOK] | queens
+        bishops_and_queens = piece_bbs[chess.BISHOP] | queens
+
+        snipers = (
+            (self.BB_RANK_ATTACKS[king][0] & rooks_and_queens)
+            | (self.BB_FILE_ATTACKS[king][0] & rooks_and_queens)
+            | (self.BB_DIAG_ATTACKS[king][0] & bishops_and_queens)
+        ) & self.occupied_co[not self.turn]
+
+        occupied = self.occupied
+        between = self.BB_BETWEEN[king]
+        blockers = 0
+        while snipers:
+            sniper = snipers & -snipers
+            snipers ^= sniper
+
+            line = between[sniper.bit_length() - 1] & occupied
+            if line and not line & (line - 1):
+                blockers |= line
+
+        return blockers & self.occupied_co[self.turn]
+
+    def generate_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        moves = []
+        append = moves.append
+
+        turn = self.turn
+        piece_bbs = self.piece_bbs
+        us = self.occupied_co[turn]
+        occupied = self.occupied
+
+        king_mask = piece_bbs[chess.KING] & us
+        king = king_mask.bit_length() - 1
+        checkers = self.attackers_mask(not turn, king)
+        self._in_check = bool(checkers)
+
+        if from_mask & king_mask:
+            # the king is lifted off the board so it can't shelter behind itself from a slider
+            targets = self.BB_KING_ATTACKS[king] & ~us & to_mask
+            without_king = occupied ^ king_mask
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                to_square = target.bit_length() - 1
+                if not self.attackers_mask(not turn, to_square, without_king):
+                    append(king | to_square << 6)
+
+            if not checkers and self.castling_rights & us:
+                self._append_castling_moves(moves, king, to_mask)
+
+        if checkers:
+            # in double check only the king can move
+            if checkers & (checkers - 1):
+                return moves
+
+            # otherwise block the check or capture the checking piece
+            target_mask = (self.BB_BETWEEN[king][checkers.bit_length() - 1] | checkers) & to_mask
+        else:
+            target_mask = to_mask
+
+        blockers = self._slider_blockers(king)
+        rays = self.BB_RAYS[king]
+        target_mask &= ~us
+
+        # a pinned knight can never move
+        pieces = piece_bbs[chess.KNIGHT] & us & from_mask & ~blockers
+        knight_attacks = self.BB_KNIGHT_ATTACKS
+        while pieces:
+            piece = pieces & -pieces
+            pieces ^= piece
+            from_square = piece.bit_length() - 1
+
+            targets = knight_attacks[from_square] & target_mask
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                append(from_square | (target.bit_length() - 1) << 6)
+
+        queens = piece_bbs[chess.QUEEN]
+        diag_masks = self.BB_DIAG_MASKS
+        diag_attacks = self.BB_DIAG_ATTACKS
+        pieces = (piece_bbs[chess.BISHOP] | queens) & us & from_mask
+        while pieces:
+            piece = pieces & -pieces
+            pieces ^= piece
+            from_square = piece.bit_length() - 1
+
+            targets = diag_attacks[from_square][diag_masks[from_square] & occupied] & target_mask
+            if piece & blockers:
+                targets &= rays[from_square]
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                append(from_square | (target.bit_length() - 1) << 6)
+
+        rank_masks = self.BB_RANK_MASKS
+        rank_attacks = self.BB_RANK_ATTACKS
+        file_masks = self.BB_FILE_MASKS
+        file_attacks = self.BB_FILE_ATTACKS
+        pieces = (piece_bbs[chess.ROOK] | queens) & us & from_mask
+        while pieces:
+            piece = pieces & -pieces
+            pieces ^= piece
+            from_square = piece.bit_length() - 1
+
+            targets = (
+                rank_attacks[from_square][rank_masks[from_square] & occupied]
+                | file_attacks[from_square][file_masks[from_square] & occupied]
+            ) & target_mask
+            if piece & blockers:
+                targets &= rays[from_square]
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                append(from_square | (target.bit_length() - 1) << 6)
+
+        pawns = piece_bbs[chess.PAWN] & us & from_mask
+        if pawns:
+            self._append_pawn_moves(moves, pawns, target_mask, blockers, rays)
+
+            ep_square = self.ep_square
+            if ep_square is not None and to_mask & self.BB_SQUARES[ep_square]:
+                self._append_en_passant(moves, pawns, king)
+
+        return moves
+
+    def _append_pawn_moves(self, moves, pawns, target_mask, blockers, rays):
+        append = moves.append
+        turn = self.turn
+        empty = ~self.occupied
+        promotion_types = self.PROMOTION_TYPES
+
+        if turn == chess.WHITE:
+            single_pushes = (pawns << 8) & empty
+            double_pushes = ((single_pushes & chess.BB_RANK_3) << 8) & empty
+            step = 8
+        else:
+            single_pushes = (pawns >> 8) & empty
+            double_pushes = ((single_pushes & chess.BB_RANK_6) >> 8) & empty
+            step = -8
+
+        back_rank = chess.BB_BACKRANKS
+
+        targets = single_pushes & target_mask
+        while targets:
+            target = targets & -targets
+            targets ^= target
+            to_square = target.bit_length() - 1
+            from_square = to_square - step
+
+            if blockers & self.BB_SQUARES[from_square] and not rays[from_square] & target:
+                continue
+
+            if target & back_rank:
+                for promotion in promotion_types:
+                    append(from_square | to_square << 6 | promotion << 12)
+            else:
+                append(from_square | to_square << 6)
+
+        targets = double_pushes & target_mask
+        while targets:
+            target = targets & -targets
+            targets ^= target
+            to_square = target.bit_length() - 1
+            from_square = to_square - 2 * step
+
+            if blockers & self.BB_SQUARES[from_square] and not rays[from_square] & target:
+                continue
+
+            append(from_square | to_square << 6)
+
+        capture_mask = target_mask & self.occupied_co[not turn]
+        pawn_attacks = self.BB_PAWN_ATTACKS[turn]
+        while pawns:
+            piece = pawns & -pawns
+            pawns ^= piece
+            from_square = piece.bit_length() - 1
+
+            targets = pawn_attacks[from_square] & capture_mask
+            if targets and piece & blockers:
+                targets &= rays[from_square]
+
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                to_square = target.bit_length() - 1
+
+                if target & back_rank:
+                    for promotion in promotion_types:
+                        append(from_square | to_square << 6 | promotion << 12)
+                else:
+                    append(from_square | to_square << 6)
+
+    def _append_en_passant(self, moves, pawns, king):
+        turn = self.turn
+        ep_square = self.ep_square
+        capture_square = ep_square - 8 if turn == chess.WHITE else ep_square + 8
+        capture_mask = self.BB_SQUARES[capture_square]
+        ep_mask = self.BB_SQUARES[ep_square]
+
+        capturers = self.BB_PAWN_ATTACKS[not turn][ep_square] & pawns
+        while capturers:
+            capturer = capturers & -capturers
+            capturers ^= capturer
+
+            # rare enough to check the position afterwards directly, the captured pawn is gone and the line it
+            # stood on may be open
+            occupied = (self.occupied ^ capturer ^ capture_mask) | ep_mask
+            if not self.attackers_mask(not turn, king, occupied) & ~capture_mask:
+                moves.append(capturer.bit_length() - 1 | ep_square << 6)
+
+    def _append_castling_moves(self, moves, king, to_mask):
+        turn = self.turn
+        occupied = self.occupied
+        rights = self.castling_rights & (chess.BB_RANK_1 if turn == chess.WHITE else chess.BB_RANK_8)
+        back_rank = 0 if turn == chess.WHITE else 56
+        them = not turn
+
+        # the squares between king and rook must be empty and the king may not pass through check
+        if rights & self.BB_SQUARES[chess.H1 + back_rank] and to_mask & self.BB_SQUARES[chess.G1 + back_rank] \
+                and not occupied & (self.BB_SQUARES[chess.F1 + back_rank] | self.BB_SQUARES[chess.G1 + back_rank]) \
+                and not self.attackers_mask(them, chess.F1 + back_rank) \
+                and not self.attackers_mask(them, chess.G1 + back_rank):
+            moves.append(king | (chess.G1 + back_rank) << 6)
+
+        if rights & self.BB_SQUARES[chess.A1 + back_rank] and to_mask & self.BB_SQUARES[chess.C1 + back_rank] \
+                and not occupied & (
+                    self.BB_SQUARES[chess.B1 + back_rank] | self.BB_SQUARES[chess.C1 + back_rank]
+                    | self.BB_SQUARES[chess.D1 + back_rank]
+                ) \
+                and not self.attackers_mask(them, chess.D1 + back_rank) \
+                and not self.attackers_mask(them, chess.C1 + back_rank):
+            moves.append(king | (chess.C1 + back_rank) << 6)
+
+    def generate_legal_captures(self):
+        us = self.occupied_co[self.turn]
+        moves = self.generate_legal_moves(chess.BB_ALL, self.occupied_co[not self.turn])
+
+        if self.ep_square is not None:
+            self._append_en_passant(moves, self.piece_bbs[chess.PAWN] & us, self.king(self.turn))
+
+        return moves
+
+    @property
+    def legal_moves(self):
+        return self.generate_legal_moves()
+
+    def is_legal(self, move):
+        if not move:
+            return False
+
+        from_square = move & 0x3F
+        if not self.occupied_co[self.turn] & self.BB_SQUARES[from_square]:
+            return False
+
+        return move in self.generate_legal_moves(self.BB_SQUARES[from_square], self.BB_SQUARES[(move >> 6) & 0x3F])
+
+    def is_capture(self, move):
+        to_square = (move >> 6) & 0x3F
+        return bool(self.mailbox[to_square]) or self.is_en_passant(move)
+
+    def is_en_passant(self, move):
+        # a pawn can only reach the empty square behind a double pushed pawn by capturing it
+        return (move >> 6) & 0x3F == self.ep_square and self.mailbox[move & 0x3F] == chess.PAWN
+
+    def static_exchange(self, move):
+        # material the side to move comes out with if both sides keep recapturing on the move's square with their
+        # cheapest piece and either may stop when carrying on would lose more. sliders behind a piece that has
+        # captured join in, pins are ignored
+        from_square = move & 0x3F
+        square = (move >> 6) & 0x3F
+        values = self.SEE_VALUES
+        piece_bbs = self.piece_bbs
+        mailbox = self.mailbox
+
+        occupied = self.occupied & ~self.BB_SQUARES[from_square]
+        if self.is_en_passant(move):
+            captured_type = chess.PAWN
+            occupied &= ~self.BB_SQUARES[square ^ 8]
+        else:
+            captured_type = mailbox[square]
+
+        promotion = move >> 12
+        gains = [values[captured_type] + (values[promotion] - values[chess.PAWN] if promotion else 0)]
+        piece_on_square = values[promotion or mailbox[from_square]]
+
+        bishops_and_queens = piece_bbs[chess.BISHOP] | piece_bbs[chess.QUEEN]
+        rooks_and_queens = piece_bbs[chess.ROOK] | piece_bbs[chess.QUEEN]
+        diagonal_mask = self.BB_DIAG_MASKS[square]
+        diagonal_attacks = self.BB_DIAG_ATTACKS[square]
+        rank_mask = self.BB_RANK_MASKS[square]
+        rank_attacks = self.BB_RANK_ATTACKS[square]
+        file_mask = self.BB_FILE_MASKS[square]
+        file_attacks = self.BB_FILE_ATTACKS[square]
+
+        attackers = self.attackers_mask(chess.WHITE, square, occupied) \
+            | self.attackers_mask(chess.BLACK, square, occupied)
+        side = not self.turn
+
+        while True:
+            side_attackers = attackers & self.occupied_co[side]
+            if not side_attackers:
+                break
+
+            for attacker_type in range(chess.PAWN, chess.KING + 1):
+                attacker = side_attackers & piece_bbs[attacker_type]
+                if attacker:
+                    break
+
+            # the king can only take last, into a square nothing defends any more
+            if attacker_type == chess.KING and attackers & self.occupied_co[not side]:
+                break
+
+            gains.append(piece_on_square - gains[-1])
+            piece_on_square = values[attacker_type]
+
+            occupied ^= attacker & -attacker
+            attackers &= occupied
+
+            # the capturer moved off the line, uncovering whatever slider stood behind it
+            if attacker_type in (chess.PAWN, chess.BISHOP, chess.QUEEN, chess.KING):
+                attackers |= diagonal_attacks[diagonal_mask & occupied] & bishops_and_queens & occupied
+            if attacker_type in (chess.ROOK, chess.QUEEN, chess.KING):
+                attackers |= (rank_attacks[rank_mask & occupied] | file_attacks[file_mask & occupied]) \
+                    & rooks_and_queens & occupied
+
+            side = not side
+
+        while len(gains) > 1:
+            gain = gains.pop()
+            gains[-1] = -max(-gains[-1], gain)
+
+        return gains[0]
+
+    def is_stalemate(self):
+        if self.is_check():
+            return False
+
+        # out of check any move by a piece that isn't pinned is legal, which settles almost every position
+        # without generating the moves
+        turn = self.turn
+        piece_bbs = self.piece_bbs
+        us = self.occupied_co[turn]
+        empty = ~self.occupied
+        free = us & ~self._slider_blockers(self.king(turn))
+
+        pawns = piece_bbs[chess.PAWN] & free
+        if (pawns << 8 if turn == chess.WHITE else pawns >> 8) & empty:
+            return False
+
+        knights = piece_bbs[chess.KNIGHT] & free
+        while knights:
+            knight = knights & -knights
+            knights ^= knight
+            if self.BB_KNIGHT_ATTACKS[knight.bit_length() - 1] & ~us:
+                return False
+
+        return not self.generate_legal_moves()
+
+    def is_insufficient_material(self):
+        piece_bbs = self.piece_bbs
+        if piece_bbs[chess.PAWN] | piece_bbs[chess.ROOK] | piece_bbs[chess.QUEEN]:
+            return False
+
+        # a lone minor piece, or bishops that all stand on squares of one colour, can't force or stumble into mate
+        minors = piece_bbs[chess.KNIGHT] | piece_bbs[chess.BISHOP]
+        if not minors & (minors - 1):
+            return True
+
+        bishops = piece_bbs[chess.BISHOP]
+        return not piece_bbs[chess.KNIGHT] and (
+            not bishops & chess.BB_DARK_SQUARES or not bishops & chess.BB_LIGHT_SQUARES
+        )
+
+    def is_repetition_draw(self):
+        # any earlier occurrence since the last irreversible move counts as a draw inside the search
+        key = self.zobrist_key
+        key_stack = self._key_stack
+
+        earliest = max(0, len(key_stack) - self.halfmove_clock)
+        for index in range(len(key_stack) - 4, earliest - 1, -2):
+            if key_stack[index][0] == key:
+                return True
+
+        return False
@@ -0,0 +1,177 @@
+import json
+import time
+
+
+# opt in timing of the search's hot paths. attaching replaces methods on the instances with timed wrappers,
+# so an engine that was never attached runs exactly the code it always did
+class Profiler:
+    SEARCH_METHODS = ('_is_draw', '_probe_tablebase')
+    EVALUATION_METHODS = (
+        'evaluate', '_evaluate_piece_square_tables', '_probe_pawn_structure', '_evaluate_pawn_structure',
+        '_evaluate_pawns', '_evaluate_king_pawn_shield', '_penalty_for_open_file', '_penalty_for_shield',
+        '_mop_up_eval',
+    )
+    TRANS_TABLE_METHODS = ('probe', 'store')
+    BOARD_METHODS = (
+        'push', 'pop', 'generate_legal_moves', 'generate_legal_captures', 'attackers_mask', 'is_check', 'is_legal',
+        'is_capture', 'static_exchange', 'is_stalemate', 'is_repetition_draw', 'is_insufficient_material',
+    )
+
+    # counters read off the search and its table before and after each iteration
+    ITERATION_COUNTERS = ('nodes', 'q_nodes', 'tt_probes', 'tt_hits', 'tt_stores', 'tt_cutoffs', 'beta_cutoffs',
+                          'first_move_cutoffs')
+
+    def __init__(self):
+        # name -> [calls, seconds], times include everything the component calls
+        self.components = {}
+        # depth -> counter totals over the iterations completed at that depth
+        self.depths = {}
+        self.search_time = 0.0
+
+        # board class -> subclass with the timed methods
+        self.board_types = {}
+
+    def attach(self, search):
+        for name in self.SEARCH_METHODS:
+            self._wrap(search, name, f"search.{name}")
+        for name in self.EVALUATION_METHODS:
+            self._wrap(search.eval, name, f"evaluation.{name}")
+        for name in self.TRANS_TABLE_METHODS:
+            self._wrap(search.trans_table, name, f"trans_table.{name}")
+
+        self._wrap_iterations(search)
+
+        # every search walks its own copy of the board, instrument each one as it is made
+        start_search = search._start_search
+
+        def profiled_start_search(*args, **kwargs):
+            board = start_search(*args, **kwargs)
+            self.attach_board(board)
+            return board
+
+        search._start_search = profiled_start_search
+
+        return self
+
+    def attach_board(self, board):
+        # boards use __slots__, so rather than on the instance the timed methods go on a subclass the board is
+        # switched over to
+        board_type = type(board)
+        profiled_type = self.board_types.get(board_type)
+
+        if profiled_type is None:
+            profiled_type = type(f"Profiled{board_type.__name__}", (board_type,), {'__slots__': ()})
+            for name in self.BOARD_METHODS:
+                self._wrap(profiled_type, name, f"board.{name}")
+
+            self.board_types[board_type] = profiled_type
+
+        board.__class__ = profiled_type
+
+    def _wrap(self, owner, name, label):
+        function = getattr(owner, name)
+        stats = self.components.setdefault(label, [0, 0.0])
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += perf_counter() - start
+
+        setattr(owner, name, timed)
+
+    def _wrap_iterations(self, search):
+        # each aspiration search is one iteration, or one root move of an iteration when searching moves
+        # separately, so the depth it reaches is its depth plus the ply it starts at
+        aspiration_search = search._aspiration_search
+
+        def counters():
+            trans_table = search.trans_table
+            return (
+                search.nodes_searched, search.q_nodes_searched, trans_table.probes, trans_table.hits,
+                trans_table.stores, search.table_hits, search.beta_cutoffs, search.first_move_cutoffs,
+            )
+
+        def profiled_aspiration_search(board, depth, previous_score, ply=0):
+            before = counters()
+            start = time.perf_counter()
+            try:
+                result = aspiration_search(board, depth, previous_score, ply)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.search_time += elapsed
+
+            # only reached by iterations that completed, one cut short by the clock would distort the numbers
+            totals = self.depths.setdefault(depth + ply, dict.fromkeys(self.ITERATION_COUNTERS + ('time',), 0))
+            for name, old, new in zip(self.ITERATION_COUNTERS, before, counters()):
+                totals[name] += new - old
+            totals['time'] += elapsed
+
+            return result
+
+        search._aspiration_search = profiled_aspiration_search
+
+    def reset(self):
+        for stats in self.components.values():
+            stats[0] = 0
+            stats[1] = 0.0
+
+        self.depths = {}
+        self.search_time = 0.0
+
+    @classmethod
+    def combine(cls, profilers):
+        # one profiler holding the totals of several, e.g. every engine of a pool
+        combined = cls()
+
+        for profiler in profilers:
+            for label, (calls, seconds) in list(profiler.components.items()):
+                stats = combined.components.setdefault(label, [0, 0.0])
+                stats[0] += calls
+                stats[1] += seconds
+
+            for depth, totals in list(profiler.depths.items()):
+                combined_totals = combined.depths.setdefault(depth, dict.fromkeys(totals, 0))
+                for name, value in list(totals.items()):
+                    combined_totals[name] += value
+
+            combined.search_time += profiler.search_time
+
+        return combined
+
+    def report(self):
+        components = {
+            label: {
+                'calls': calls,
+                'time': seconds,
+                'time_per_call_us': seconds / calls * 1e6 if calls else 0,
+                'share': seconds / self.search_time if self.search_time else 0,
+            }
+            for label, (calls, seconds) in sorted(self.components.items(), key=lambda item: item[1][1], reverse=True)
+        }
+
+        depths = {}
+        previous_nodes = None
+        for depth in sorted(self.depths):
+            totals = self.depths[depth]
+            nodes = totals['nodes'] + totals['q_nodes']
+
+            depths[depth] = dict(
+                totals,
+                tt_hit_rate=totals['tt_hits'] / totals['tt_probes'] if totals['tt_probes'] else 0,
+                branching_factor=nodes / previous_nodes if previous_nodes else None,
+            )
+            previous_nodes = nodes
+
+        return {
+            'search_time': self.search_time,
+            'components': components,
+            'depths': depths,
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
@@ -1,192 +1,609 @@
-import copy
-import time
-
 import chess
 
-from Core.Evaluation.Evaluation import Evaluation
-from Core.Search.Tablebase import get_best_move
+from Core.Evaluation.Evaluation import Evaluation, MaterialInfo
+from Core.Search.MovePicker import MovePicker
+from Core.Search.Position import Position
+from Core.Search.Profiler import Profiler
+from Core.Search.Tablebase import Tablebase, create_tablebase
+from Core.Search.TimeManager import TimeManager
+from Core.Search.TranspositionTable import TranspositionTable
 
 
 class Search:
-    def __init__(self, time_limit=None):
+    INFINITY = Evaluation.CHECKMATE_SCORE + 1
+    # scores this close to checkmate encode a forced mate
+    MATE_BOUND = Evaluation.CHECKMATE_SCORE - 1000
+    # tablebase wins rank below mates but are reported in centipawns, on the same scale as a root tablebase answer.
+    # both count as decisive
+    TABLEBASE_WIN_SCORE = Tablebase.WIN_SCORE
+    DECISIVE_BOUND = TABLEBASE_WIN_SCORE - 1000
+
+    ASPIRATION_MIN_DEPTH = 3
+    ASPIRATION_WINDOW = 50
+    ASPIRATION_MAX_WINDOW = 800
+
+    MAX_PLY = 128
+
+    # seconds per move when the caller gives no time, node or clock limit at all
+    DEFAULT_TIME_LIMIT = 10
+    KILLERS_PER_PLY = 2
+
+    # margin on top of a capture's material gain before it is considered able to raise alpha
+    DELTA_MARGIN = 200
+
+    NULL_MOVE_MIN_DEPTH = 3
+    NULL_MOVE_REDUCTION = 2
+
+    # quiet moves this late in the ordering are searched shallower first
+    LMR_MIN_DEPTH = 3
+    LMR_MIN_MOVES = 3
+
+    # indexed by remaining depth, how far the static evaluation can plausibly move
+    FUTILITY_MARGINS = (0, 200, 350)
+    REVERSE_FUTILITY_MARGINS = (0, 150, 300, 450)
+
+    SEE_VALUES = Position.SEE_VALUES
+
+    def __init__(self, time_limit=None, hash_size_mb=TranspositionTable.DEFAULT_SIZE_MB, tablebase=None,
+                 null_move_pruning=True, late_move_reductions=True, futility_pruning=True, trans_table=None,
+                 profile=False):
         self.eval = Evaluation()
-        # self.trans_table = {}
 
+        # selectivity, each can be switched off to compare against the full width search
+        self.null_move_pruning = null_move_pruning
+        self.late_move_reductions = late_move_reductions
+        self.futility_pruning = futility_pruning
+
+        # pass Tablebase() to search without any tablebase
+        self.tablebase = tablebase if tablebase is not None else create_tablebase()
+
+        # kept across calls to search so later moves reuse earlier work, or shared between searching processes
+        self.trans_table = trans_table if trans_table is not None else TranspositionTable(hash_size_mb)
+
+        # default time per move for searches that don't give their own
         self.time_limit = time_limit
+        self.time_manager = TimeManager()
+
+        # quiet move ordering, killers are indexed [ply], history and countermoves [colour][move's from and to squares]
+        self.killers = [[None] * self.KILLERS_PER_PLY for _ in range(self.MAX_PLY)]
+        self.history = [[0] * 4096 for _ in range(2)]
+        self.countermoves = [[None] * 4096 for _ in range(2)]
+
+        # triangular pv table, pv_table[ply] is the best line found from the node at that ply
+        self.pv_table = [[] for _ in range(self.MAX_PLY + 2)]
+        self.seldepth = 0
+        self.completed_depth = 0
 
         # vars to track performance
         self.nodes_searched = 0
+        self.q_nodes_searched = 0
         self.table_hits = 0
+        self.tablebase_hits = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+
+        # per component timings, only collected when asked for since the instrumentation slows every node
+        self.profiler = Profiler().attach(self) if profile else None
+
+    def new_game(self):
+        # nothing learned about the previous game carries over
+        self.trans_table.clear()
+
+        for killers in self.killers:
+            killers[:] = [None] * self.KILLERS_PER_PLY
+
+        for colour in (chess.WHITE, chess.BLACK):
+            self.history[colour] = [0] * 4096
+            self.countermoves[colour] = [None] * 4096
+
+    def search(self, board, max_depth=3, time_limit=None, node_limit=None,
+               wtime=None, btime=None, winc=0, binc=0, movestogo=None, start_depth=1, stop_event=None,
+               info_callback=None):
+        best_move, evaluation = self.tablebase.get_best_move(board)
+        if best_move:
+            # a tablebase answer is as good as a search of any depth
+            self.completed_depth = self.MAX_PLY
+            return best_move, evaluation if board.turn == chess.WHITE else -evaluation
+
+        iterations = self.iterate(
+            board, max_depth, time_limit, node_limit, wtime, btime, winc, binc, movestogo, start_depth, stop_event
+        )
+        for info in iterations:
+            if info_callback is not None:
+                info_callback(info)
 
-    def search(self, board, max_depth=3, time_limit=10):
-        if len(board.piece_map()) <= 6:
-            best_move, evaluation = get_best_move(board.fen())
-            if best_move:
-                return best_move, evaluation
+        if self.best_move_found:
+            return self.best_move_found, self.best_move_evaluation
+        else:
+            return self._fallback_move(board), 0
+
+    def iterate(self, board, max_depth=3, time_limit=None, node_limit=None,
+                wtime=None, btime=None, winc=0, binc=0, movestogo=None, start_depth=1, stop_event=None):
+        # iterative deepening, yields an info dict as each iteration completes so callers can stream
+        # progress or stop early. best_move_found holds the result of the last completed iteration
+        search_board = self._start_search(board, time_limit, node_limit, wtime, btime, winc, binc, movestogo, stop_event)
+
+        # the search scores from the side to move, callers get scores from white's perspective
+        perspective = 1 if board.turn == chess.WHITE else -1
+        iteration_scores = []
+
+        # a start past the depth limit still searches the limit itself, a limit below 1 searches nothing and
+        # leaves the fallback move
+        for depth in range(max(1, min(start_depth, max_depth)), min(max_depth, self.MAX_PLY) + 1):
+            if not self.time_manager.should_start_iteration():
+                break
 
-        self.nodes_searched = 0
+            try:
+                # without a settled horizon scores swing between odd and even depths,
+                # so centre the window on the last iteration of the same parity
+                previous_score = iteration_scores[-2] if len(iteration_scores) >= 2 else None
 
-        self.trans_table = {}
+                best_move, score = self._aspiration_search(search_board, depth, previous_score)
 
-        self.start_time = time.time()
-        self.time_limit = time_limit
+            except TimeoutError:
+                # out of time or nodes, the last completed iteration stands
+                break
 
-        self.best_move_found = None
-        self.best_move_evaluation = 0
+            iteration_scores.append(score)
+
+            # moves leave the search as chess.Move
+            self.best_move_found = Position.decode_move(best_move) if best_move is not None else None
+            self.best_move_evaluation = score * perspective
+            self.completed_depth = depth
+
+            self.time_manager.iteration_completed(self.nodes_searched + self.q_nodes_searched)
+
+            yield self.info(depth, score, self.pv_table[0] or ([best_move] if best_move is not None else []))
+
+    def info(self, depth, score, principal_variation):
+        # score is from the side to move, mate is in moves and negative when the side to move is getting mated.
+        # the principal variation is in the search's encoded moves
+        nodes = self.nodes_searched + self.q_nodes_searched
+        elapsed = self.time_manager.elapsed()
+
+        return {
+            'depth': depth,
+            'seldepth': self.seldepth,
+            'score': score,
+            'mate': self.mate_in(score),
+            'nodes': nodes,
+            'nps': int(nodes / elapsed) if elapsed > 0 else 0,
+            'time': elapsed,
+            'hashfull': self.trans_table.hashfull(),
+            'table_hits': self.table_hits,
+            'tablebase_hits': self.tablebase_hits,
+            'pv': [Position.decode_move(move) for move in principal_variation],
+        }
+
+    @classmethod
+    def mate_in(cls, score):
+        # moves to mate for a mate score, negative when the side the score is for is getting mated
+        if abs(score) < cls.MATE_BOUND:
+            return None
+
+        plies = Evaluation.CHECKMATE_SCORE - abs(score)
+        return (plies + 1) // 2 if score > 0 else -((plies + 1) // 2)
 
-        maximising_player = board.turn == chess.WHITE
+    def search_moves(self, board, moves, max_depth=3, time_limit=None, node_limit=None, stop_event=None,
+                     info_callback=None):
+        # exact scores for each of the given root moves instead of only the best one, for multi pv analysis.
+        # returns (move, evaluation, principal variation) best first, evaluations from white's perspective.
+        # info_callback gets the best move's info with every move's result under 'lines' after each depth
+        search_board = self._start_search(board, time_limit, node_limit, stop_event=stop_event)
 
+        perspective = 1 if board.turn == chess.WHITE else -1
+        move_scores = {move: [] for move in moves}
+        results = []
 
+        for depth in range(1, min(max_depth, self.MAX_PLY) + 1):
+            if not self.time_manager.should_start_iteration():
+                break
 
-        # iterative deepening
-        for depth in range(1, max_depth + 1):
             try:
-                best_move, evaluation = self.minimax(
-                    board, depth, maximising_player, alpha=float('-inf'), beta=float('inf'),
-                )
-                self.best_move_found = best_move
-                self.best_move_evaluation = evaluation
+                iteration = []
+                for move, scores in move_scores.items():
+                    previous_score = -scores[-2] if len(scores) >= 2 else None
+
+                    search_board.push(Position.encode_move(move))
+                    score = -self._aspiration_search(search_board, depth - 1, previous_score, ply=1)[1]
+                    search_board.pop()
+
+                    principal_variation = [move] + [Position.decode_move(pv_move) for pv_move in self.pv_table[1]]
+                    iteration.append((score, move, principal_variation))
 
             except TimeoutError:
-                # search terminated as time exceeded
                 break
 
-        if self.best_move_found:
-            return self.best_move_found, self.best_move_evaluation
-        else:
-            # haven't found a move, just get any move
-            return list(board.legal_moves)[0], 0
+            iteration.sort(key=lambda x: x[0], reverse=True)
+            for score, move, principal_variation in iteration:
+                move_scores[move].append(score)
 
-        # return self.minimax(board, depth = depth, maximising_player = maximising_player,
-        #                     alpha=float('-inf'), beta=float('inf'))
+            results = [
+                (move, score * perspective, principal_variation) for score, move, principal_variation in iteration
+            ]
 
-    def _is_base_case(self, depth, board):
-        return depth == 0 or board.is_game_over()
+            self.completed_depth = depth
+            self.time_manager.iteration_completed(self.nodes_searched + self.q_nodes_searched)
 
-    def _handle_base_case(self, depth, board):
-        if board.is_checkmate():
-            # if white won, return high score, otherwise return negative high score
-            return (None, -1 * Evaluation.CHECKMATE_SCORE + depth) if board.turn == chess.WHITE \
-                else (None, Evaluation.CHECKMATE_SCORE - depth)
+            if info_callback is not None and iteration:
+                info = self.info(depth, iteration[0][0], [])
+                info['pv'] = iteration[0][2]
+                info['lines'] = results
+                info_callback(info)
 
-        # if stalemated, score of 0 (dead even)
-        elif board.is_stalemate() or board.is_insufficient_material():
-            return None, 0
+        return results
+
+    def _start_search(self, board, time_limit=None, node_limit=None, wtime=None, btime=None, winc=0, binc=0,
+                      movestogo=None, stop_event=None):
+        if time_limit is None:
+            time_limit = self.time_limit
+
+        clock = wtime if board.turn == chess.WHITE else btime
+        if time_limit is None and node_limit is None and clock is None:
+            time_limit = self.DEFAULT_TIME_LIMIT
+
+        self.time_manager = TimeManager(
+            time_limit, node_limit, wtime, btime, winc, binc, movestogo, board.turn, stop_event
+        )
+
+        self.nodes_searched = 0
+        self.q_nodes_searched = 0
+        self.table_hits = 0
+        self.tablebase_hits = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.seldepth = 0
+
+        self.trans_table.new_search()
+        self._age_move_ordering()
+
+        self.best_move_found = None
+        self.best_move_evaluation = 0
+        self.completed_depth = 0
 
-        return None, self.eval.evaluate(board)
+        # search on the engine's own board, an aborted iteration can leave moves pushed on it
+        return Position.from_board(board)
 
-    def minimax(self, board, depth, maximising_player, alpha, beta):
+    def _fallback_move(self, board):
+        # not even the first iteration finished, try whatever the aborted one stored for the root
+        entry = self.trans_table.probe(Position.from_board(board).zobrist_key)
+        if entry is not None and entry[0] is not None:
+            move = Position.decode_move(entry[0])
+            if board.is_legal(move):
+                return move
+
+        return next(iter(board.legal_moves), None)
+
+    def _check_limits(self):
+        nodes = self.nodes_searched + self.q_nodes_searched
+        if nodes >= self.time_manager.next_check:
+            self.time_manager.check(nodes)
+
+    def _aspiration_search(self, board, depth, previous_score, ply=0):
+        if previous_score is None or depth < self.ASPIRATION_MIN_DEPTH or self._is_decisive_score(previous_score):
+            return self.negamax(board, depth, -self.INFINITY, self.INFINITY, ply)
+
+        delta = self.ASPIRATION_WINDOW
+        alpha = previous_score - delta
+        beta = previous_score + delta
+
+        while True:
+            best_move, score = self.negamax(board, depth, alpha, beta, ply)
+
+            # widen whichever side of the window the score fell outside of and search again
+            if score <= alpha:
+                alpha = max(score - delta, -self.INFINITY)
+            elif score >= beta:
+                beta = min(score + delta, self.INFINITY)
+            else:
+                return best_move, score
+
+            delta *= 2
+            if delta > self.ASPIRATION_MAX_WINDOW:
+                alpha, beta = -self.INFINITY, self.INFINITY
+
+    @staticmethod
+    def _is_draw(board):
+        return board.is_repetition_draw() or board.halfmove_clock >= 100 or board.is_insufficient_material()
+
+    def _evaluate(self, board):
+        evaluation = self.eval.evaluate(board)
+        return evaluation if board.turn == chess.WHITE else -evaluation
+
+    def quiescence(self, board, alpha, beta, ply):
+        self.q_nodes_searched += 1
+        self._check_limits()
+
+        if ply > self.seldepth:
+            self.seldepth = ply
+
+        if board.is_check():
+            return self._quiescence_evasions(board, alpha, beta, ply)
+
+        # standing pat, the side to move doesn't have to capture
+        stand_pat = self._evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+
+        # not even winning a queen could bring the score back up to alpha
+        if stand_pat + self.SEE_VALUES[chess.QUEEN] + self.DELTA_MARGIN < alpha:
+            return stand_pat
+
+        tactical_moves = MovePicker.tactical_moves(board)
+        # only a position without captures can be stalemate, so the check is rarely needed
+        if not tactical_moves and board.is_stalemate():
+            return 0
+
+        alpha = max(alpha, stand_pat)
+        best_eval = stand_pat
+
+        for move in tactical_moves:
+            if not move >> Position.PROMOTION_SHIFT:
+                captured_value = self.SEE_VALUES[chess.PAWN] if board.is_en_passant(move) \
+                    else self.SEE_VALUES[board.mailbox[(move >> Position.TO_SHIFT) & Position.SQUARE_MASK]]
+
+                # delta pruning
+                if stand_pat + captured_value + self.DELTA_MARGIN <= alpha:
+                    continue
+
+                # losing captures can't improve on standing pat
+                if MovePicker.is_losing_capture(board, move):
+                    continue
+
+            board.push(move)
+            evaluation = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+
+            if evaluation > best_eval:
+                best_eval = evaluation
+
+            alpha = max(alpha, evaluation)
+            if alpha >= beta:
+                break
+
+        return best_eval
+
+    def _quiescence_evasions(self, board, alpha, beta, ply):
+        best_eval = -self.INFINITY
+
+        for move in board.legal_moves:
+            board.push(move)
+            evaluation = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+
+            if evaluation > best_eval:
+                best_eval = evaluation
+
+            alpha = max(alpha, evaluation)
+            if alpha >= beta:
+                break
+
+        if best_eval == -self.INFINITY:
+            # no way out of check
+            return -Evaluation.CHECKMATE_SCORE + ply
+
+        return best_eval
+
+    def negamax(self, board, depth, alpha, beta, ply):
         self.nodes_searched += 1
+        self._check_limits()
 
-        board_key = board._transposition_key()
-        if board_key in self.trans_table:
-            entry = self.trans_table[board_key]
-            if entry['depth'] >= depth:
-                self.table_hits += 1
-                return entry['best_move'], entry['evaluation']
+        if ply > self.seldepth:
+            self.seldepth = ply
 
-        if self._is_base_case(depth, board):
-            return self._handle_base_case(depth, board)
+        self.pv_table[ply] = []
 
-        best_move = None
+        # the root always needs a move, even in a drawn position
+        if ply > 0 and self._is_draw(board):
+            return None, 0
 
-        moves = list(board.legal_moves)
-        moves = self.order_moves(board, moves)
+        if ply > 0 and self.tablebase.supports_interior_probes and board.halfmove_clock == 0:
+            tablebase_score = self._probe_tablebase(board, ply)
+            if tablebase_score is not None:
+                return None, tablebase_score
+
+        board_key = board.zobrist_key
+        hash_move = None
+        pv_node = beta - alpha > 1
+
+        entry = self.trans_table.probe(board_key)
+        if entry is not None:
+            hash_move, entry_evaluation, entry_depth, entry_flag = entry
+            entry_evaluation = self._score_from_table(entry_evaluation, ply)
+
+            # a stored score is only usable if it is deep enough and its bound proves a result in this window. the
+            # root and pv nodes search on regardless, with the hash move first, so they return a full principal
+            # variation
+            if ply > 0 and not pv_node and entry_depth >= depth and (
+                entry_flag == TranspositionTable.EXACT
+                or (entry_flag == TranspositionTable.LOWERBOUND and entry_evaluation >= beta)
+                or (entry_flag == TranspositionTable.UPPERBOUND and entry_evaluation <= alpha)
+            ):
+                self.table_hits += 1
+                if hash_move is not None:
+                    self.pv_table[ply] = [hash_move]
+                return hash_move, entry_evaluation
 
-        if maximising_player:
-            max_eval = float('-inf')
+        if depth == 0:
+            return None, self.quiescence(board, alpha, beta, ply)
 
-            for move in moves:
-                board.push(move)
-                _, evaluation = self.minimax(board, depth - 1, False, alpha, beta)
-                board.pop()
+        in_check = board.is_check()
 
-                if evaluation > max_eval:
-                    max_eval = evaluation
-                    best_move = move
+        # near the leaves a position far from the window is unlikely to be rescued by one more move
+        static_eval = None
+        if not pv_node and not in_check and (self.futility_pruning or self.null_move_pruning):
+            static_eval = self._evaluate(board)
 
-                alpha = max(alpha, evaluation)
-                if beta <= alpha:
-                    break
+            if self.futility_pruning and depth < len(self.REVERSE_FUTILITY_MARGINS) \
+                    and not self._is_decisive_score(beta) \
+                    and static_eval - self.REVERSE_FUTILITY_MARGINS[depth] >= beta:
+                return None, static_eval
 
-            self.trans_table[board_key] = {
-                'depth': depth,
-                'best_move': best_move,
-                'evaluation': max_eval
-            }
+            if self.null_move_pruning and depth >= self.NULL_MOVE_MIN_DEPTH and static_eval >= beta \
+                    and self._can_pass(board):
+                null_move_score = self._null_move_search(board, depth, beta, ply)
+                if null_move_score >= beta:
+                    # an unproven mate from a reduced search isn't trusted
+                    return None, beta if self._is_decisive_score(null_move_score) else null_move_score
 
-            return best_move, max_eval
+        futile = self.futility_pruning and static_eval is not None and depth < len(self.FUTILITY_MARGINS) \
+            and not self._is_decisive_score(alpha) and static_eval + self.FUTILITY_MARGINS[depth] <= alpha
 
-        else:
-            min_eval = float('inf')
+        original_alpha = alpha
 
-            for move in moves:
-                board.push(move)
-                _, evaluation = self.minimax(board, depth - 1, True, alpha, beta)
-                board.pop()
+        best_move = None
+        best_eval = -self.INFINITY
 
-                if evaluation < min_eval:
-                    min_eval = evaluation
-                    best_move = move
+        colour = board.turn
+        history = self.history[colour]
+        killers = self.killers[ply] if ply < self.MAX_PLY else ()
 
-                beta = min(beta, evaluation)
-                if beta <= alpha:
-                    break
+        # the move that answered the opponent's last move elsewhere in the tree
+        previous_move = board.move_stack[-1] if board.move_stack else None
+        countermove = self.countermoves[colour][previous_move & Position.FROM_TO_MASK] if previous_move else None
 
-            self.trans_table[board_key] = {
-                'depth': depth,
-                'best_move': best_move,
-                'evaluation': min_eval
-            }
+        move_picker = MovePicker(board, hash_move, killers, countermove, history)
 
-            return best_move, min_eval
+        for move_index, move in enumerate(move_picker):
+            quiet = move_picker.stage == MovePicker.QUIET_MOVES
 
+            board.push(move)
+            gives_check = board.is_check()
 
-    def order_moves(self, board, moves):
-        move_scores = []
+            if move_index == 0:
+                evaluation = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)[1]
+            else:
+                # futility pruning, a quiet move can't raise a hopeless static evaluation past alpha
+                if futile and quiet and not gives_check:
+                    board.pop()
+                    continue
 
-        for move in moves:
-            score = 0
+                reduction = 0
+                if self.late_move_reductions and quiet and not in_check and not gives_check \
+                        and depth >= self.LMR_MIN_DEPTH and move_index >= self.LMR_MIN_MOVES:
+                    reduction = 1 if move_index < 2 * self.LMR_MIN_MOVES or depth < 2 * self.LMR_MIN_DEPTH else 2
 
-            if board.is_capture(move):
-                # MVV - LVA (most valuable victim attacked by least valuable attacker)
-                victim_value = self.get_piece_value(
-                    board.piece_at(move.to_square) # get piece at target square
-                )
-                attacker_value = self.get_piece_value(
-                    board.piece_at(move.from_square) # piece at original square
-                )
+                # principal variation search, prove the move is no better than the first with a null window
+                evaluation = -self.negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)[1]
+                if reduction and evaluation > alpha:
+                    evaluation = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)[1]
+                if alpha < evaluation < beta:
+                    evaluation = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)[1]
 
-                score += 10 * victim_value - attacker_value
+            board.pop()
 
-            if board.gives_check(move):
-                score += 50
+            if evaluation > best_eval:
+                best_eval = evaluation
+                best_move = move
 
-            if move.promotion:
-                score += 100
+            if evaluation > alpha:
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
 
-            if move == self.best_move_found:
-                score += 1000 # prioritise best move found in iterative deepening
+            alpha = max(alpha, evaluation)
+            if alpha >= beta:
+                self.beta_cutoffs += 1
+                if move_index == 0:
+                    self.first_move_cutoffs += 1
 
-            move_scores.append((score, move))
+                if not MovePicker.is_tactical(board, move):
+                    self._update_quiet_move_ordering(move, previous_move, colour, depth, ply)
+                break
 
-        move_scores.sort(reverse=True, key=lambda x: x[0])
-        ordered_moves = [move for score, move in move_scores]
+        if best_move is None:
+            # side to move has been mated (prefer the shortest mate) or stalemated
+            return None, -Evaluation.CHECKMATE_SCORE + ply if in_check else 0
 
-        return ordered_moves
+        self._store(board_key, depth, original_alpha, beta, best_eval, best_move, ply)
 
-    @staticmethod
-    def get_piece_value(piece):
-        if piece is None:
-            return 0
+        return best_move, best_eval
 
-        values =  {
-            chess.PAWN: 1,
-            chess.KNIGHT: 3,
-            chess.BISHOP: 3,
-            chess.ROOK: 5,
-            chess.QUEEN: 9,
-            chess.KING: 0, # not possible
-        }
+    @staticmethod
+    def _can_pass(board):
+        # passing is only safe after a real move, and not in pawn endgames where zugzwang is common
+        if not board.move_stack or not board.move_stack[-1]:
+            return False
+
+        return MaterialInfo(board.eval_state, board.turn).endgameT < 1
+
+    def _null_move_search(self, board, depth, beta, ply):
+        reduction = self.NULL_MOVE_REDUCTION + (1 if depth > 6 else 0)
+
+        board.push(Position.NULL_MOVE)
+        score = -self.negamax(board, max(0, depth - 1 - reduction), -beta, -beta + 1, ply + 1)[1]
+        board.pop()
+
+        return score
+
+    def _update_quiet_move_ordering(self, move, previous_move, colour, depth, ply):
+        if ply < self.MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+
+        # deeper cutoffs say more about a move than ones near the horizon
+        self.history[colour][move & Position.FROM_TO_MASK] += depth * depth
+
+        if previous_move:
+            self.countermoves[colour][previous_move & Position.FROM_TO_MASK] = move
+
+    def _age_move_ordering(self):
+        # killers are tied to plies of the last search, history only fades so it can keep what still applies
+        for killers in self.killers:
+            killers[:] = [None] * self.KILLERS_PER_PLY
+
+        for history in self.history:
+            history[:] = [score // 2 for score in history]
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0
+
+    @classmethod
+    def _is_decisive_score(cls, score):
+        return abs(score) >= cls.DECISIVE_BOUND
+
+    @classmethod
+    def _score_to_table(cls, score, ply):
+        # mate and tablebase scores are stored relative to the node rather than the root
+        if score >= cls.DECISIVE_BOUND:
+            return score + ply
+        if score <= -cls.DECISIVE_BOUND:
+            return score - ply
+        return score
+
+    @classmethod
+    def _score_from_table(cls, score, ply):
+        if score >= cls.DECISIVE_BOUND:
+            return score - ply
+        if score <= -cls.DECISIVE_BOUND:
+            return score + ply
+        return score
+
+    def _probe_tablebase(self, board, ply):
+        # tablebases read chess.Board, only worth building one for positions they cover
+        if not self.tablebase.can_probe(board):
+            return None
+
+        wdl = self.tablebase.probe_wdl(board.to_board())
+        if wdl is None:
+            return None
+
+        self.tablebase_hits += 1
+
+        # cursed wins and blessed losses are draws under the fifty move rule, prefer the nearest win
+        if wdl >= 2:
+            return self.TABLEBASE_WIN_SCORE - ply
+        if wdl <= -2:
+            return -self.TABLEBASE_WIN_SCORE + ply
+        return 0
+
+    def _store(self, board_key, depth, alpha, beta, evaluation, best_move, ply):
+        if evaluation <= alpha:
+            flag = TranspositionTable.UPPERBOUND
+        elif evaluation >= beta:
+            flag = TranspositionTable.LOWERBOUND
+        else:
+            flag = TranspositionTable.EXACT
 
-        return values.get(piece.piece_type, 0)
\ No newline at end of file
+        self.trans_table.store(board_key, depth, flag, self._score_to_table(evaluation, ply), best_move)
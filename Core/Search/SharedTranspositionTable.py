@@ -0,0 +1,51 @@
+from multiprocessing import shared_memory
+
+from Core.Search.TranspositionTable import TranspositionTable
+
+
+# transposition table in shared memory so several search processes can read and write it without locks,
+# a torn write from two processes fails the xor check and reads as a miss
+class SharedTranspositionTable(TranspositionTable):
+    def __init__(self, size_mb=TranspositionTable.DEFAULT_SIZE_MB):
+        self.shared_memory = None
+        super().__init__(size_mb)
+
+    def _allocate(self, num_words):
+        self.close()
+
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=num_words * 8)
+        self.owner = True
+        return self.shared_memory.buf.cast('Q')
+
+    @classmethod
+    def attach(cls, name, num_buckets, age=0):
+        table = cls.__new__(cls)
+        table.shared_memory = shared_memory.SharedMemory(name=name)
+        table.owner = False
+        table.table = table.shared_memory.buf.cast('Q')
+
+        table.num_buckets = num_buckets
+        table.bucket_mask = num_buckets - 1
+        table.age = age
+        table.reset_stats()
+
+        return table
+
+    def clear(self):
+        self.shared_memory.buf[:] = bytes(len(self.shared_memory.buf))
+
+        # attached processes take the age over with their next search
+        self.age = 0
+        self.reset_stats()
+
+    def close(self):
+        if self.shared_memory is None:
+            return
+
+        # the view has to go before the segment can be closed
+        self.table.release()
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+
+        self.shared_memory = None
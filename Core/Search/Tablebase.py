@@ -1,28 +1,247 @@
+import collections
+import os
+import time
+
+import chess
+import chess.syzygy
 import requests
 
-def query_tablebase(fen):  # Query the tablebase when 7 pieces or less
-    url = "http://tablebase.lichess.ovh/standard"  # table base api
-    params = {"fen": fen.replace(" ", "_")}
-    return requests.get(url, params=params)
+from Core.Search.Zobrist import Zobrist
+
+
+# base backend, probes nothing so the search runs without tablebases
+class Tablebase:
+    WIN_SCORE = 100000
+
+    DEFAULT_CACHE_SIZE = 1 << 16
+
+    max_pieces = 0
+    # whether probing is cheap enough to do at interior nodes of the search
+    supports_interior_probes = False
+    # whether unknown results are cached, not for backends where unknown may only mean the probe failed this time
+    cache_unknown = True
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def can_probe(self, board: chess.Board):
+        return not board.castling_rights and chess.popcount(board.occupied) <= self.max_pieces
+
+    def probe_wdl(self, board: chess.Board):
+        # win/draw/loss for the side to move (2, 1, 0, -1, -2), or None when unknown
+        if not self.can_probe(board):
+            return None
+
+        return self._cached(('wdl', self._position_key(board)), lambda: self._probe_wdl(board), None)
+
+    def get_best_move(self, board: chess.Board):
+        if not self.can_probe(board):
+            return None, 0
+
+        return self._cached(('root', self._position_key(board)), lambda: self._get_best_move(board), (None, 0))
+
+    def _probe_wdl(self, board: chess.Board):
+        return None
+
+    def _get_best_move(self, board: chess.Board):
+        return None, 0
+
+    @staticmethod
+    def _position_key(board: chess.Board):
+        # boards used by the search already carry their key
+        key = getattr(board, 'zobrist_key', None)
+        return key if key is not None else Zobrist.hash_board(board)
+
+    def _cached(self, key, probe, unknown):
+        cache = self.cache
+        if key in cache:
+            self.cache_hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.cache_misses += 1
+        result = probe()
+        if result == unknown and not self.cache_unknown:
+            return result
+
+        cache[key] = result
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+        return result
+
+    def close(self):
+        self.cache.clear()
+
+
+class SyzygyTablebase(Tablebase):
+    supports_interior_probes = True
+
+    def __init__(self, path, cache_size=Tablebase.DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+
+        self.tablebase = chess.syzygy.Tablebase()
+        for directory in path.split(os.pathsep):
+            if directory:
+                self.tablebase.add_directory(directory)
+
+        # table names look like KQvK, one letter per piece
+        self.max_pieces = max((len(name) - 1 for name in self.tablebase.wdl), default=0)
+
+    def _probe_wdl(self, board: chess.Board):
+        return self.tablebase.get_wdl(board)
+
+    def _get_best_move(self, board: chess.Board):
+        best_move = None
+        best_rank = None
+        best_wdl = 0
+
+        for move in list(board.legal_moves):
+            board.push(move)
+            try:
+                # probes are from the opponent's side after the move
+                wdl = -self.tablebase.probe_wdl(board)
+                dtz = self.tablebase.probe_dtz(board)
+                mates = board.is_checkmate()
+            except KeyError:
+                # missing dtz tables, let the search handle it
+                return None, 0
+            finally:
+                board.pop()
+
+            # mate now, otherwise zero the dtz counter as fast as possible when winning
+            # and as slowly as possible when losing
+            rank = (wdl, mates, -abs(dtz) if wdl > 0 else abs(dtz))
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank, best_wdl = move, rank, wdl
+
+        if best_move is None:
+            return None, 0
+
+        return best_move, self._wdl_to_evaluation(best_wdl)
+
+    def _wdl_to_evaluation(self, wdl):
+        # cursed wins and blessed losses are draws under the fifty move rule
+        if wdl >= 2:
+            return self.WIN_SCORE
+        if wdl <= -2:
+            return -self.WIN_SCORE
+        return 0
+
+    def close(self):
+        super().close()
+        self.tablebase.close()
+
+
+class LichessTablebase(Tablebase):
+    URL = "http://tablebase.lichess.ovh/standard"  # table base api
+
+    max_pieces = 6
+    # timeouts and server errors come back as unknown, the next probe should try again
+    cache_unknown = False
+
+    def __init__(self, timeout=2.0, retries=2, backoff=0.25, cache_size=Tablebase.DEFAULT_CACHE_SIZE):
+        super().__init__(cache_size)
+
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+
+    def query_tablebase(self, fen):
+        params = {"fen": fen.replace(" ", "_")}
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.URL, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Error querying tablebase: {e}")
+            else:
+                # rate limited or server trouble is worth another try, anything else isn't
+                if response.status_code != 429 and response.status_code < 500:
+                    return response
+                print(f"Error querying tablebase: {response.status_code}")
+
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+
+        return None
+
+    def _get_best_move(self, board: chess.Board):
+        response = self.query_tablebase(board.fen())
+        if response is None or not response.ok:
+            return None, 0
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            print(f"Error querying tablebase: {e}")
+            return None, 0
 
-def get_best_move(fen):
-    response = query_tablebase(fen)
-    if response.ok:
-        data = response.json()
         if "moves" in data and data["moves"]:
-            best_move_uci = data["moves"][0]["uci"]
+            best_move = chess.Move.from_uci(data["moves"][0]["uci"])
             category = data.get('category', 'unknown')
             # Determine evaluation based on category
             if category == 'win':
-                evaluation = 100000  # High positive value
+                evaluation = self.WIN_SCORE  # High positive value
             elif category == 'loss':
-                evaluation = -100000  # High negative value
+                evaluation = -self.WIN_SCORE  # High negative value
             else:
                 evaluation = 0  # Draw
-            return best_move_uci, evaluation
+            return best_move, evaluation
         else:
             print("No moves available or not a tablebase position.")
             return None, 0
-    else:
-        print(f"Error querying tablebase: {response.status_code}")
-        return None, 0
\ No newline at end of file
+
+    def close(self):
+        super().close()
+        self.session.close()
+
+
+class FallbackTablebase(Tablebase):
+    # probes the primary backend first and only asks the fallback for root moves it can't answer
+    def __init__(self, primary: Tablebase, fallback: Tablebase):
+        super().__init__(cache_size=0)
+
+        self.primary = primary
+        self.fallback = fallback
+
+        self.max_pieces = max(primary.max_pieces, fallback.max_pieces)
+        self.supports_interior_probes = primary.supports_interior_probes
+
+    def probe_wdl(self, board: chess.Board):
+        return self.primary.probe_wdl(board)
+
+    def get_best_move(self, board: chess.Board):
+        best_move, evaluation = self.primary.get_best_move(board)
+        if best_move:
+            return best_move, evaluation
+
+        return self.fallback.get_best_move(board)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+def create_tablebase(syzygy_path=None, http_fallback=False):
+    # local syzygy files from SYZYGY_PATH when set, with the lichess api as a fallback only when asked for, its
+    # probes block the search on the network
+    syzygy_path = syzygy_path if syzygy_path is not None else os.environ.get("SYZYGY_PATH")
+
+    backends = []
+    if syzygy_path:
+        backends.append(SyzygyTablebase(syzygy_path))
+    if http_fallback:
+        backends.append(LichessTablebase())
+
+    if not backends:
+        return Tablebase()
+    if len(backends) == 1:
+        return backends[0]
+
+    return FallbackTablebase(*backends)
@@ -0,0 +1,111 @@
+import time
+
+import chess
+
+
+# decides how long a search may run and when it has to stop, times are in seconds
+class TimeManager:
+    # nodes between deadline checks, a few milliseconds of search at python speeds
+    CHECK_INTERVAL = 256
+
+    # time lost between deciding on a move and the clock stopping
+    MOVE_OVERHEAD = 0.05
+
+    DEFAULT_MOVES_TO_GO = 30
+    # the hard limit may borrow this many average moves worth of time, but never more than this share of the clock
+    HARD_LIMIT_MOVES = 4
+    HARD_LIMIT_CLOCK_FRACTION = 0.5
+
+    # branching factor assumed until two iterations have been completed
+    DEFAULT_BRANCHING_FACTOR = 4
+    # iterations smaller than this were answered from the transposition table rather than searched, so they say
+    # nothing about how the tree grows
+    MIN_BRANCHING_NODES = 32
+
+    def __init__(self, time_limit=None, node_limit=None, wtime=None, btime=None, winc=0, binc=0, movestogo=None,
+                 turn=chess.WHITE, stop_event=None):
+        self.node_limit = node_limit
+        # set from outside the search to stop it at the next check
+        self.stop_event = stop_event
+
+        remaining = wtime if turn == chess.WHITE else btime
+        increment = (winc if turn == chess.WHITE else binc) or 0
+
+        if time_limit is not None:
+            # a fixed time per move uses all of it
+            self.soft_limit = self.hard_limit = time_limit
+        elif remaining is not None:
+            self.soft_limit, self.hard_limit = self.clock_limits(remaining, increment, movestogo)
+        else:
+            self.soft_limit = self.hard_limit = None
+
+        self.start_time = time.perf_counter()
+        self.next_check = self.CHECK_INTERVAL if node_limit is None else min(self.CHECK_INTERVAL, node_limit)
+
+        self.iteration_times = []
+        self.iteration_nodes = []
+
+    @classmethod
+    def clock_limits(cls, remaining, increment=0, movestogo=None):
+        moves_to_go = movestogo or cls.DEFAULT_MOVES_TO_GO
+        available = max(0, remaining - cls.MOVE_OVERHEAD)
+
+        soft_limit = min(available, available / moves_to_go + increment * 0.75)
+        hard_limit = min(available * cls.HARD_LIMIT_CLOCK_FRACTION, soft_limit * cls.HARD_LIMIT_MOVES)
+
+        # on the last move before the time control the whole clock is there to use
+        if movestogo == 1:
+            hard_limit = available
+
+        return soft_limit, max(soft_limit, hard_limit)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def check(self, nodes):
+        # called once nodes reaches next_check, aborts the search from wherever it is
+        if self.node_limit is not None and nodes >= self.node_limit:
+            raise TimeoutError("node limit reached")
+
+        if self.hard_limit is not None and self.elapsed() >= self.hard_limit:
+            raise TimeoutError("time limit reached")
+
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise TimeoutError("search stopped")
+
+        self.next_check = nodes + self.CHECK_INTERVAL
+        if self.node_limit is not None:
+            self.next_check = min(self.next_check, self.node_limit)
+
+    def iteration_completed(self, nodes):
+        # record what the iteration alone cost, nodes are counted from the start of the search
+        elapsed = self.elapsed()
+        self.iteration_times.append(elapsed - sum(self.iteration_times))
+        self.iteration_nodes.append(nodes - sum(self.iteration_nodes))
+
+    def branching_factor(self):
+        nodes = self.iteration_nodes
+        if len(nodes) < 2 or nodes[-2] < self.MIN_BRANCHING_NODES:
+            return self.DEFAULT_BRANCHING_FACTOR
+
+        return max(1, nodes[-1] / nodes[-2])
+
+    def should_start_iteration(self):
+        if not self.iteration_times:
+            return True
+
+        branching_factor = self.branching_factor()
+
+        if self.node_limit is not None \
+                and sum(self.iteration_nodes) + self.iteration_nodes[-1] * branching_factor > self.node_limit:
+            return False
+
+        if self.soft_limit is None:
+            return True
+
+        elapsed = self.elapsed()
+        if elapsed >= self.soft_limit:
+            return False
+
+        # an iteration that can't finish before the hard limit would only be thrown away
+        return elapsed + self.iteration_times[-1] * branching_factor <= self.hard_limit
@@ -0,0 +1,162 @@
+import array
+
+
+class TranspositionTable:
+    EXACT = 1
+    LOWERBOUND = 2
+    UPPERBOUND = 3
+
+    DEFAULT_SIZE_MB = 16
+
+    # each entry is three 64 bit words: check (key ^ data ^ score), data, score
+    ENTRY_WORDS = 3
+    # slot 0 is depth preferred, slot 1 is always replace
+    BUCKET_WORDS = ENTRY_WORDS * 2
+
+    MASK_64 = (1 << 64) - 1
+
+    # layout of the data word, moves are the engine's 16 bit encoding with 0 for none
+    MOVE_MASK = 0xFFFF
+    DEPTH_SHIFT = 16
+    DEPTH_MASK = 0xFF
+    FLAG_SHIFT = 24
+    FLAG_MASK = 0x3
+    AGE_SHIFT = 26
+    AGE_MASK = 0xFF
+
+    HASHFULL_SAMPLE = 1000
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        self.age = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        num_buckets = max(1, (size_mb * 1024 * 1024) // (self.BUCKET_WORDS * 8))
+
+        # round down to a power of two so the index is a mask of the key
+        num_buckets = 1 << (num_buckets.bit_length() - 1)
+
+        self.num_buckets = num_buckets
+        self.bucket_mask = num_buckets - 1
+        self.table = self._allocate(num_buckets * self.BUCKET_WORDS)
+        self.reset_stats()
+
+    @staticmethod
+    def _allocate(num_words):
+        return array.array('Q', bytes(num_words * 8))
+
+    def clear(self):
+        # a fresh zeroed array, zeroing the old one a word at a time takes seconds on large tables
+        self.table = self._allocate(len(self.table))
+
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        # entries written by previous searches become stale and are replaced first
+        self.age = (self.age + 1) & self.AGE_MASK
+
+    def probe(self, key):
+        self.probes += 1
+
+        table = self.table
+        index = (key & self.bucket_mask) * self.BUCKET_WORDS
+        occupied = False
+
+        for offset in (index, index + self.ENTRY_WORDS):
+            data = table[offset + 1]
+            if not data:
+                continue
+
+            score_word = table[offset + 2]
+            if table[offset] ^ data ^ score_word == key:
+                self.hits += 1
+
+                score = score_word - (1 << 64) if score_word >> 63 else score_word
+                return (
+                    (data & self.MOVE_MASK) or None,
+                    score,
+                    (data >> self.DEPTH_SHIFT) & self.DEPTH_MASK,
+                    (data >> self.FLAG_SHIFT) & self.FLAG_MASK,
+                )
+
+            occupied = True
+
+        if occupied:
+            self.collisions += 1
+
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        self.stores += 1
+
+        table = self.table
+        index = (key & self.bucket_mask) * self.BUCKET_WORDS
+
+        data = (
+            (move or 0)
+            | max(0, min(depth, self.DEPTH_MASK)) << self.DEPTH_SHIFT
+            | flag << self.FLAG_SHIFT
+            | self.age << self.AGE_SHIFT
+        )
+        score_word = int(score) & self.MASK_64
+        check = key ^ data ^ score_word
+
+        preferred_data = table[index + 1]
+        preferred_is_same = table[index] ^ preferred_data ^ table[index + 2] == key
+        preferred_depth = (preferred_data >> self.DEPTH_SHIFT) & self.DEPTH_MASK
+        preferred_age = (preferred_data >> self.AGE_SHIFT) & self.AGE_MASK
+
+        if preferred_is_same or not preferred_data or preferred_age != self.age or depth >= preferred_depth:
+            if preferred_data and not preferred_is_same:
+                # demote the old deep entry to the always replace slot
+                table[index + 3] = table[index]
+                table[index + 4] = preferred_data
+                table[index + 5] = table[index + 2]
+
+            table[index] = check
+            table[index + 1] = data
+            table[index + 2] = score_word
+        else:
+            table[index + 3] = check
+            table[index + 4] = data
+            table[index + 5] = score_word
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0
+
+    def collision_rate(self):
+        return self.collisions / self.probes if self.probes else 0
+
+    def fill_rate(self):
+        # sample the start of the table for entries written during this search
+        table = self.table
+        sample = min(self.HASHFULL_SAMPLE, self.num_buckets * 2)
+
+        used = 0
+        for slot in range(sample):
+            data = table[slot * self.ENTRY_WORDS + 1]
+            if data and (data >> self.AGE_SHIFT) & self.AGE_MASK == self.age:
+                used += 1
+
+        return used / sample
+
+    def hashfull(self):
+        return int(self.fill_rate() * 1000)
+
+    def stats(self):
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hit_rate(),
+            'collision_rate': self.collision_rate(),
+            'fill_rate': self.fill_rate(),
+        }
@@ -0,0 +1,77 @@
+import chess
+import chess.polyglot
+
+
+class Zobrist:
+    # polyglot's random numbers, so keys agree with chess.polyglot.zobrist_hash
+    RANDOM_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+    # PIECE_SQUARE[colour][piece_type][square]
+    PIECE_SQUARE = [
+        [
+            [0] * 64 if piece_type == 0 else [
+                chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + colour) + square]
+                for square in range(64)
+            ]
+            for piece_type in range(7)
+        ]
+        for colour in (chess.BLACK, chess.WHITE)
+    ]
+
+    CASTLING = [
+        (chess.BB_H1, RANDOM_ARRAY[768]),
+        (chess.BB_A1, RANDOM_ARRAY[769]),
+        (chess.BB_H8, RANDOM_ARRAY[770]),
+        (chess.BB_A8, RANDOM_ARRAY[771]),
+    ]
+
+    EN_PASSANT_FILE = RANDOM_ARRAY[772:780]
+
+    WHITE_TO_MOVE = RANDOM_ARRAY[780]
+
+    @classmethod
+    def hash_board(cls, board: chess.Board):
+        key = 0
+
+        for colour in (chess.WHITE, chess.BLACK):
+            colour_keys = cls.PIECE_SQUARE[colour]
+            for square in chess.scan_forward(board.occupied_co[colour]):
+                key ^= colour_keys[board.piece_type_at(square)][square]
+
+        return key ^ cls.hash_castling(board.clean_castling_rights()) ^ cls.hash_en_passant(board) \
+            ^ (cls.WHITE_TO_MOVE if board.turn == chess.WHITE else 0)
+
+    @classmethod
+    def hash_pawns(cls, board: chess.Board):
+        # pawns and kings only, everything the pawn structure terms depend on
+        key = 0
+
+        for colour in (chess.WHITE, chess.BLACK):
+            colour_keys = cls.PIECE_SQUARE[colour]
+            for square in chess.scan_forward(board.pawns & board.occupied_co[colour]):
+                key ^= colour_keys[chess.PAWN][square]
+            for square in chess.scan_forward(board.kings & board.occupied_co[colour]):
+                key ^= colour_keys[chess.KING][square]
+
+        return key
+
+    @classmethod
+    def hash_castling(cls, castling_rights):
+        key = 0
+        for mask, value in cls.CASTLING:
+            if castling_rights & mask:
+                key ^= value
+
+        return key
+
+    @classmethod
+    def hash_en_passant(cls, board: chess.Board):
+        ep_square = board.ep_square
+        if ep_square is None:
+            return 0
+
+        # only hashed when a pawn of the side to move is next to the pawn that just moved
+        if board.pawns & board.occupied_co[board.turn] & chess.BB_PAWN_ATTACKS[not board.turn][ep_square]:
+            return cls.EN_PASSANT_FILE[ep_square & 7]
+
+        return 0
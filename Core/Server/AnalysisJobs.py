@@ -0,0 +1,220 @@
+import collections
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+
+
+class AnalysisJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    FINISHED = (DONE, CANCELLED, FAILED)
+
+    def __init__(self, fen, depth=None, time_limit=None, node_limit=None, multipv=1):
+        self.id = uuid.uuid4().hex
+        self.fen = fen
+        self.depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.multipv = multipv
+
+        # the search reports progress from the side to move, results are from white's perspective
+        self.perspective = 1 if chess.Board(fen).turn == chess.WHITE else -1
+
+        self.status = self.QUEUED
+        self.cached = False
+        self.progress = []
+        self.result = None
+        self.error = None
+
+        self.created = time.time()
+        self.finished = None
+
+        self.stop_event = threading.Event()
+        # woken on every progress update and when the job finishes, for streaming clients
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def format_lines(lines):
+        # (move, evaluation, principal variation) as returned by multi pv analysis
+        return [
+            {'move': move.uci(), 'evaluation': evaluation, 'pv': [pv_move.uci() for pv_move in pv]}
+            for move, evaluation, pv in lines
+        ]
+
+    def add_progress(self, info):
+        with self.condition:
+            progress = {
+                'depth': info['depth'],
+                'seldepth': info['seldepth'],
+                'score': info['score'] * self.perspective,
+                'mate': info['mate'] * self.perspective if info['mate'] is not None else None,
+                'nodes': info['nodes'],
+                'nps': info['nps'],
+                'time': info['time'],
+                'hashfull': info['hashfull'],
+                'pv': [move.uci() for move in info['pv']],
+            }
+            # multi pv progress carries every line so far, already from white's perspective
+            if 'lines' in info:
+                progress['lines'] = self.format_lines(info['lines'])
+
+            self.progress.append(progress)
+            self.condition.notify_all()
+
+    def finish(self, status, result=None, error=None):
+        with self.condition:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            self.condition.notify_all()
+
+    def wait_for_update(self, seen, timeout):
+        # blocks until there is progress past seen or the job is finished
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.progress) > seen or self.status in self.FINISHED, timeout)
+            return self.progress[seen:], self.status
+
+    def to_dict(self, include_progress=True):
+        job = {
+            'job_id': self.id,
+            'fen': self.fen,
+            'depth': self.depth,
+            'time_limit': self.time_limit,
+            'node_limit': self.node_limit,
+            'multipv': self.multipv,
+            'status': self.status,
+            'cached': self.cached,
+            'result': self.result,
+            'error': self.error,
+        }
+
+        if include_progress:
+            job['progress'] = list(self.progress)
+
+        return job
+
+
+# runs analysis jobs in the background, answering from the result cache when it can. single line jobs search on
+# engines from the pool, multi pv jobs on the multi pv process pool one at a time
+class AnalysisJobs:
+    # finished jobs are kept around this long for clients to collect
+    JOB_TTL = 600
+    MAX_JOBS = 10000
+
+    # engines analysis jobs never take, a job may hold its engine for minutes and /best-move requests must still
+    # find one free within the pool's wait
+    RESERVED_ENGINES = 1
+
+    def __init__(self, engine_pool, result_cache, multi_pv, max_workers=None):
+        self.engine_pool = engine_pool
+        self.result_cache = result_cache
+        self.multi_pv = multi_pv
+
+        # a pool of a single engine has nothing to spare, jobs and requests take turns
+        max_workers = max_workers or max(1, len(engine_pool.engines) - self.RESERVED_ENGINES)
+        self.executor = ThreadPoolExecutor(max_workers)
+        # the multi pv pool already spreads one analysis over every process
+        self.multi_pv_executor = ThreadPoolExecutor(1)
+
+        self.jobs = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, fen, depth=None, time_limit=None, node_limit=None, multipv=1):
+        job = AnalysisJob(fen, depth, time_limit, node_limit, multipv)
+
+        cached = self.result_cache.get(fen, depth, multipv) if depth is not None else None
+        if cached is not None:
+            job.cached = True
+            job.finish(AnalysisJob.DONE, cached)
+        elif multipv > 1:
+            self.multi_pv_executor.submit(self._run, job)
+        else:
+            self.executor.submit(self._run, job)
+
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        # a running search stops at its next node check and keeps what it has completed
+        job.stop_event.set()
+        with job.condition:
+            if job.status == AnalysisJob.QUEUED:
+                job.finish(AnalysisJob.CANCELLED)
+
+        return job
+
+    def _prune(self):
+        now = time.time()
+        while self.jobs:
+            job = next(iter(self.jobs.values()))
+            expired = job.finished is not None and now - job.finished > self.JOB_TTL
+            if not expired and len(self.jobs) < self.MAX_JOBS:
+                break
+
+            self.jobs.popitem(last=False)
+
+    def _run(self, job):
+        with job.condition:
+            if job.status != AnalysisJob.QUEUED:
+                return
+            job.status = AnalysisJob.RUNNING
+
+        try:
+            board = chess.Board(job.fen)
+            max_depth = job.depth or self.engine_pool.engines[0].MAX_PLY
+
+            if job.multipv > 1:
+                results = self.multi_pv.analyse(
+                    board, job.multipv, max_depth, info_callback=job.add_progress, stop_event=job.stop_event,
+                    time_limit=job.time_limit, node_limit=job.node_limit,
+                )
+                lines = job.format_lines(results)
+                completed_depth = self.multi_pv.completed_depth
+            else:
+                with self.engine_pool.checkout() as search:
+                    best_move, evaluation = search.search(
+                        board, max_depth, time_limit=job.time_limit, node_limit=job.node_limit,
+                        stop_event=job.stop_event, info_callback=job.add_progress,
+                    )
+                    pv = job.progress[-1]['pv'] if job.progress else [best_move.uci()] if best_move else []
+                    lines = [{'move': best_move.uci(), 'evaluation': evaluation, 'pv': pv}] if best_move else []
+
+                    completed_depth = search.completed_depth
+
+        except Exception as e:
+            job.finish(AnalysisJob.FAILED, error=str(e))
+            return
+
+        result = {
+            'depth': completed_depth,
+            'best_move': lines[0]['move'] if lines else None,
+            'evaluation': lines[0]['evaluation'] if lines else None,
+            'lines': lines,
+            'legal_moves': board.legal_moves.count(),
+        }
+        self.result_cache.store(job.fen, completed_depth, lines, result['legal_moves'])
+
+        job.finish(AnalysisJob.CANCELLED if job.stop_event.is_set() else AnalysisJob.DONE, result)
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.multi_pv_executor.shutdown(cancel_futures=True)
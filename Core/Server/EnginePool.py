@@ -0,0 +1,122 @@
+import collections
+import contextlib
+import os
+import threading
+
+from Core.Search.Search import Search
+
+
+class EnginePoolTimeout(Exception):
+    pass
+
+
+class Waiter:
+    __slots__ = ('session_id', 'index', 'event')
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.index = None
+        self.event = threading.Event()
+
+
+# fixed set of warm engines shared by request threads. a game keeps going back to the same engine
+# while it is free so its transposition table carries over from move to move
+class EnginePool:
+    DEFAULT_SIZE = min(4, os.cpu_count() or 1)
+    DEFAULT_QUEUE_TIMEOUT = 30
+
+    # sessions remembered across the pool, the least recently used are forgotten first
+    MAX_SESSIONS = 1024
+
+    def __init__(self, size=DEFAULT_SIZE, queue_timeout=DEFAULT_QUEUE_TIMEOUT, **search_options):
+        self.engines = [Search(**search_options) for _ in range(size)]
+        self.idle = set(range(size))
+        self.queue_timeout = queue_timeout
+
+        # session id -> index of the engine that last searched for it
+        self.sessions = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # requests waiting for an engine, served first come first served
+        self.waiters = collections.deque()
+
+        self.checkouts = 0
+        self.session_hits = 0
+
+    @contextlib.contextmanager
+    def checkout(self, session_id=None, timeout=None):
+        index = self._acquire(session_id, self.queue_timeout if timeout is None else timeout)
+        try:
+            yield self.engines[index]
+        finally:
+            self._release(index)
+
+    def _acquire(self, session_id, timeout):
+        with self.lock:
+            if self.idle and not self.waiters:
+                index = self._choose_engine(session_id)
+                self.idle.remove(index)
+                return self._assign(index, session_id)
+
+            waiter = Waiter(session_id)
+            self.waiters.append(waiter)
+
+        if waiter.event.wait(timeout):
+            return waiter.index
+
+        with self.lock:
+            # an engine may have been handed over just as the wait timed out
+            if waiter.index is not None:
+                return waiter.index
+
+            self.waiters.remove(waiter)
+            raise EnginePoolTimeout(f"no engine became free within {timeout}s")
+
+    def _release(self, index):
+        with self.lock:
+            if not self.waiters:
+                self.idle.add(index)
+                return
+
+            # hand the engine straight to the longest waiting request
+            waiter = self.waiters.popleft()
+            waiter.index = self._assign(index, waiter.session_id)
+            waiter.event.set()
+
+    def _assign(self, index, session_id):
+        self.checkouts += 1
+
+        if session_id is not None:
+            if self.sessions.get(session_id) == index:
+                self.session_hits += 1
+
+            self.sessions[session_id] = index
+            self.sessions.move_to_end(session_id)
+            if len(self.sessions) > self.MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+
+        return index
+
+    def _choose_engine(self, session_id):
+        # the session's own engine if it is free, otherwise the one whose sessions were used longest ago
+        index = self.sessions.get(session_id)
+        if index in self.idle:
+            return index
+
+        last_used = {index: -1 for index in self.idle}
+        for position, engine_index in enumerate(self.sessions.values()):
+            if engine_index in last_used:
+                last_used[engine_index] = position
+
+        return min(last_used, key=last_used.get)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.engines),
+                'idle': len(self.idle),
+                'waiting': len(self.waiters),
+                'checkouts': self.checkouts,
+                'session_hits': self.session_hits,
+                'sessions': len(self.sessions),
+            }
@@ -0,0 +1,72 @@
+import collections
+import threading
+
+
+# lru cache of finished analyses, keyed by position. a result searched deeper, or with more lines,
+# also answers any shallower request for the same position
+class ResultCache:
+    DEFAULT_SIZE = 10000
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def position_key(fen):
+        # placement, side to move, castling and en passant, the move counters don't change the analysis
+        return " ".join(fen.split()[:4])
+
+    def get(self, fen, depth, multipv=1):
+        key = self.position_key(fen)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['depth'] < depth or len(entry['lines']) < min(multipv, entry['legal_moves']):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            return dict(entry, lines=entry['lines'][:multipv])
+
+    def store(self, fen, depth, lines, legal_moves):
+        # lines are dicts with move, evaluation and pv, best first
+        if depth <= 0 or not lines:
+            return
+
+        key = self.position_key(fen)
+        best = lines[0]
+        entry = {
+            'depth': depth,
+            'best_move': best['move'],
+            'evaluation': best['evaluation'],
+            'lines': lines,
+            'legal_moves': legal_moves,
+        }
+
+        with self.lock:
+            existing = self.entries.get(key)
+            # never trade a deeper result, or an equally deep one with more lines, for this one
+            if existing is not None and (
+                existing['depth'] > depth or (existing['depth'] == depth and len(existing['lines']) > len(lines))
+            ):
+                self.entries.move_to_end(key)
+                return
+
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -4,6 +4,12 @@ import chess
 from Core.Search.Search import Search
 
 
+def print_info(info):
+    score = f"mate {info['mate']}" if info['mate'] is not None else f"cp {info['score']}"
+    pv = " ".join(move.uci() for move in info['pv'])
+    print(f"depth {info['depth']} seldepth {info['seldepth']} score {score} nodes {info['nodes']} nps {info['nps']} pv {pv}")
+
+
 def main():
     board = chess.Board()
     search = Search(time_limit=5)
@@ -16,7 +22,7 @@ def main():
         print("Bot is thinking...")
         start = time.time()
 
-        best_move, evaluation = search.search(board, 7)
+        best_move, evaluation = search.search(board, 7, info_callback=print_info)
 
         end = time.time()
 
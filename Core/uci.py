@@ -0,0 +1,297 @@
+import os
+import sys
+import threading
+import time
+
+import chess
+
+from Core.Search.LazySMP import LazySMP
+from Core.Search.Search import Search
+from Core.Search.Tablebase import create_tablebase
+from Core.Search.TimeManager import TimeManager
+from Core.Search.TranspositionTable import TranspositionTable
+
+
+# uci front end, searches run on a background thread so stop and ponderhit can be handled while thinking
+class UCIEngine:
+    NAME = "Chesster"
+    AUTHOR = "Chesster developers"
+
+    MAX_HASH_MB = 4096
+    MAX_THREADS = os.cpu_count() or 1
+
+    # go parameters that take a value, uci times are in milliseconds
+    GO_PARAMETERS = ("depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "nodes", "mate")
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()
+
+        self.hash_size_mb = TranspositionTable.DEFAULT_SIZE_MB
+        self.threads = 1
+        self.syzygy_path = None
+
+        self.engine = None
+        self.board = chess.Board()
+
+        self.search_thread = None
+        self.stop_event = threading.Event()
+        # released by stop or ponderhit, an infinite or ponder search holds its bestmove until then
+        self.release_event = threading.Event()
+        self.pondering = False
+        self.ponderhit_deadline = None
+        self.clock = None
+        self.timer = None
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def get_engine(self):
+        # built on first use so the options sent before isready apply, then kept so the table stays warm
+        if self.engine is None:
+            tablebase = create_tablebase(self.syzygy_path, http_fallback=False)
+
+            if self.threads > 1:
+                self.engine = LazySMP(self.threads, hash_size_mb=self.hash_size_mb, tablebase=tablebase)
+            else:
+                self.engine = Search(hash_size_mb=self.hash_size_mb, tablebase=tablebase)
+
+        return self.engine
+
+    def close_engine(self):
+        if isinstance(self.engine, LazySMP):
+            self.engine.close()
+
+        self.engine = None
+
+    def run(self, lines=sys.stdin):
+        for line in lines:
+            try:
+                if not self.handle(line.strip()):
+                    break
+            except ValueError as e:
+                # a malformed command (bad number, fen or move) is ignored, the gui carries on with the next one
+                self.send(f"info string ignoring '{line.strip()}': {e}")
+
+        self.stop()
+        self.close_engine()
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+
+        command, arguments = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {self.NAME}")
+            self.send(f"id author {self.AUTHOR}")
+            self.send(f"option name Hash type spin default {TranspositionTable.DEFAULT_SIZE_MB} min 1 "
+                      f"max {self.MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {self.MAX_THREADS}")
+            self.send("option name Ponder type check default false")
+            self.send("option name SyzygyPath type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.get_engine()
+            self.send("readyok")
+        elif command == "setoption":
+            self.set_option(arguments)
+        elif command == "ucinewgame":
+            self.stop()
+            self.get_engine().new_game()
+        elif command == "position":
+            self.set_position(arguments)
+        elif command == "go":
+            self.go(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponderhit()
+        elif command == "quit":
+            return False
+
+        return True
+
+    def set_option(self, arguments):
+        if "name" not in arguments:
+            return
+
+        value_index = arguments.index("value") if "value" in arguments else len(arguments)
+        name = " ".join(arguments[arguments.index("name") + 1:value_index]).lower()
+        value = " ".join(arguments[value_index + 1:])
+
+        self.stop()
+
+        if name == "hash":
+            self.hash_size_mb = max(1, min(self.MAX_HASH_MB, int(value)))
+            if isinstance(self.engine, Search):
+                self.engine.trans_table.resize(self.hash_size_mb)
+            else:
+                self.close_engine()
+        elif name == "threads":
+            self.threads = max(1, min(self.MAX_THREADS, int(value)))
+            self.close_engine()
+        elif name == "syzygypath":
+            self.syzygy_path = value if value and value != "<empty>" else None
+            self.close_engine()
+
+    def set_position(self, arguments):
+        if not arguments:
+            return
+
+        moves_index = arguments.index("moves") if "moves" in arguments else len(arguments)
+
+        if arguments[0] == "startpos":
+            board = chess.Board()
+        elif arguments[0] == "fen":
+            board = chess.Board(" ".join(arguments[1:moves_index]))
+        else:
+            return
+
+        for move in arguments[moves_index + 1:]:
+            board.push_uci(move)
+
+        self.board = board
+
+    def go(self, arguments):
+        self.stop()
+
+        parameters = {}
+        for index, argument in enumerate(arguments[:-1]):
+            if argument in self.GO_PARAMETERS:
+                parameters[argument] = int(arguments[index + 1])
+
+        infinite = "infinite" in arguments
+        self.pondering = "ponder" in arguments
+
+        limits = {}
+        if "movetime" in parameters:
+            limits['time_limit'] = parameters['movetime'] / 1000
+        if "nodes" in parameters:
+            limits['node_limit'] = parameters['nodes']
+
+        clock = {
+            'wtime': parameters.get('wtime'), 'btime': parameters.get('btime'),
+            'winc': parameters.get('winc', 0), 'binc': parameters.get('binc', 0),
+            'movestogo': parameters.get('movestogo'),
+        }
+        clock = {key: value / 1000 if key != 'movestogo' and value is not None else value
+                 for key, value in clock.items()}
+
+        if infinite or self.pondering:
+            # pondering searches until ponderhit puts it on the clock
+            self.clock = (limits.pop('time_limit', None), clock)
+            limits['time_limit'] = float('inf')
+        else:
+            if clock['wtime'] is not None or clock['btime'] is not None:
+                limits.update(clock)
+
+            # depth limited or bare go searches run until they finish or are stopped
+            if not limits:
+                limits['time_limit'] = float('inf')
+
+        max_depth = parameters.get('depth', Search.MAX_PLY)
+        if "mate" in parameters:
+            max_depth = min(max_depth, parameters['mate'] * 2)
+
+        self.stop_event.clear()
+        self.release_event.clear()
+        self.ponderhit_deadline = None
+
+        self.search_thread = threading.Thread(
+            target=self.search, args=(self.board.copy(), max_depth, limits, infinite or self.pondering), daemon=True
+        )
+        self.search_thread.start()
+
+    def search(self, board, max_depth, limits, hold_bestmove):
+        engine = self.get_engine()
+        last_info = {}
+
+        def info_callback(info):
+            last_info.update(info)
+            self.send_info(info)
+
+            # after a ponderhit the search runs on the clock, stop once the soft limit is used up
+            if self.ponderhit_deadline is not None and time.perf_counter() >= self.ponderhit_deadline:
+                self.stop_event.set()
+
+        best_move, _ = engine.search(
+            board, max_depth, info_callback=info_callback, stop_event=self.stop_event, **limits
+        )
+
+        # uci doesn't allow bestmove before stop or ponderhit when searching infinitely or pondering
+        if hold_bestmove:
+            self.release_event.wait()
+
+        if best_move is None:
+            self.send("bestmove 0000")
+            return
+
+        pv = last_info.get('pv', [])
+        if len(pv) > 1 and pv[0] == best_move:
+            self.send(f"bestmove {best_move.uci()} ponder {pv[1].uci()}")
+        else:
+            self.send(f"bestmove {best_move.uci()}")
+
+    def send_info(self, info):
+        score = f"mate {info['mate']}" if info['mate'] is not None else f"cp {info['score']}"
+        pv = " ".join(move.uci() for move in info['pv'])
+
+        self.send(
+            f"info depth {info['depth']} seldepth {info['seldepth']} score {score} nodes {info['nodes']} "
+            f"nps {info['nps']} time {int(info['time'] * 1000)} hashfull {info['hashfull']} "
+            f"tbhits {info['tablebase_hits']} pv {pv}"
+        )
+
+    def ponderhit(self):
+        if not self.pondering or self.search_thread is None:
+            return
+
+        self.pondering = False
+        movetime, clock = self.clock
+
+        # the predicted move was played, the search carries on under the real time control from now
+        if self.board.turn == chess.WHITE:
+            remaining, increment = clock['wtime'], clock['winc']
+        else:
+            remaining, increment = clock['btime'], clock['binc']
+
+        if movetime is not None:
+            self.start_timer(movetime)
+        elif remaining is not None:
+            soft_limit, hard_limit = TimeManager.clock_limits(remaining, increment, clock['movestogo'])
+            self.ponderhit_deadline = time.perf_counter() + soft_limit
+            self.start_timer(hard_limit)
+
+        self.release_event.set()
+
+    def start_timer(self, seconds):
+        self.timer = threading.Timer(seconds, self.stop_event.set)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        if self.search_thread is None:
+            return
+
+        self.stop_event.set()
+        self.release_event.set()
+        self.search_thread.join()
+
+        self.search_thread = None
+        self.pondering = False
+
+
+def main():
+    UCIEngine().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# keeps the repository root on the import path, so the tests import Core the way main.py and server.py do
@@ -1,5 +1,19 @@
+import sys
+
 from Core.game import main
 
-# if __name__ == '__main__':
-#     main()
+if __name__ == '__main__':
+    # python main.py [bench | perft | uci], self-play without arguments
+    command = sys.argv[1] if len(sys.argv) > 1 else None
 
+    if command == "bench":
+        from Core.Benchmarks.bench import main as bench
+        bench(sys.argv[2:])
+    elif command == "perft":
+        from Core.Benchmarks.perft import main as perft
+        perft(sys.argv[2:])
+    elif command == "uci":
+        from Core.uci import main as uci
+        uci()
+    else:
+        main()
@@ -1,36 +1,220 @@
 # server.py
-from flask import Flask, request, jsonify
+import json
+import os
+import threading
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import chess
-from Core.Search.Search import Search
+from Core.Server.AnalysisJobs import AnalysisJobs
+from Core.Server.EnginePool import EnginePool, EnginePoolTimeout
+from Core.Server.ResultCache import ResultCache
+from Core.Search.MultiPV import MultiPV
+from Core.Search.Profiler import Profiler
 
 app = Flask(__name__)
 CORS(app)
 
+# longest a single request may search for, whatever it asks for
+MAX_TIME_LIMIT = 30
+DEFAULT_TIME_LIMIT = 10
+
+# analysis jobs may run longer, but not forever
+MAX_ANALYSIS_TIME_LIMIT = 300
+MAX_MULTIPV = 10
+
+# seconds a stream waits for progress before sending a keep alive comment
+STREAM_KEEPALIVE = 15
+
+# ENGINE_PROFILE=1 times the engines' components for /stats, at the cost of slower searches
+PROFILE = os.environ.get("ENGINE_PROFILE") == "1"
+
+result_cache = ResultCache()
+
+# warm engines shared by all requests and the process pool multi pv analysis runs on. they are built by
+# start_engines rather than on import, so importing the module starts no threads or processes
+engine_pool = None
+multi_pv = None
+analysis_jobs = None
+engines_lock = threading.Lock()
+
+
+def start_engines():
+    global engine_pool, multi_pv, analysis_jobs
+
+    with engines_lock:
+        if engine_pool is not None:
+            return
+
+        engine_pool = EnginePool(int(os.environ.get("ENGINE_POOL_SIZE", EnginePool.DEFAULT_SIZE)), profile=PROFILE)
+        # multi pv analysis jobs run on their own process pool, one worker per core unless told otherwise
+        multi_pv = MultiPV(int(os.environ.get("MULTIPV_WORKERS", 0)) or None)
+        analysis_jobs = AnalysisJobs(engine_pool, result_cache, multi_pv)
+
+
+@app.before_request
+def ensure_engines_started():
+    # servers that import the app instead of running this module start the engines on the first request
+    if engine_pool is None:
+        start_engines()
+
+
+def parse_limit(data, name, convert):
+    value = data.get(name)
+    if value is None:
+        return None
+
+    value = convert(value)
+    if value <= 0:
+        raise ValueError(value)
+
+    return value
+
+
 @app.route("/best-move", methods=["POST"])
 def best_move():
     data = request.get_json()
     fen = data.get("fen")
-    depth = data.get("depth", 3)  # Default to depth 3 if not provided
+    # requests from the same game share an engine so its transposition table stays warm
+    session_id = data.get("session_id")
 
     if not fen:
         return jsonify({"error": f"Invalid FEN ({fen})"}), 400
 
     try:
-        depth = int(depth)
+        board = chess.Board(fen)
     except ValueError:
-        return jsonify({"error": f"Invalid depth value ({depth})"}), 400
+        return jsonify({"error": f"Invalid FEN ({fen})"}), 400
+
+    try:
+        depth = parse_limit(data, "depth", int) or 3  # Default to depth 3 if not provided
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid depth value ({data.get('depth')})"}), 400
+
+    try:
+        time_limit = parse_limit(data, "time_limit", float)
+        node_limit = parse_limit(data, "node_limit", int)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid limit ({e})"}), 400
+
+    time_limit = min(time_limit or DEFAULT_TIME_LIMIT, MAX_TIME_LIMIT)
 
-    board = chess.Board(fen)
-    search = Search()
+    # the same position was already searched at least this deep
+    cached = result_cache.get(board.fen(), depth)
+    if cached is not None:
+        return jsonify({"best_move": cached["best_move"], "evaluation": cached["evaluation"], "nodes": 0,
+                        "cached": True})
 
     try:
-        best_move, evaluation = search.search(board, max_depth=depth)
-        print(best_move, evaluation)
-        print(best_move.uci())
-        return jsonify({"best_move": best_move.uci()})
+        with engine_pool.checkout(session_id) as search:
+            best_move, evaluation = search.search(board, max_depth=depth, time_limit=time_limit, node_limit=node_limit)
+            nodes = search.nodes_searched + search.q_nodes_searched
+            completed_depth = search.completed_depth
+    except EnginePoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    if best_move is None:
+        return jsonify({"error": "No legal moves"}), 400
+
+    result_cache.store(board.fen(), completed_depth, [{"move": best_move.uci(), "evaluation": evaluation,
+                                               "pv": [best_move.uci()]}], board.legal_moves.count())
+
+    return jsonify({"best_move": best_move.uci(), "evaluation": evaluation, "nodes": nodes, "cached": False})
+
+
+@app.route("/analysis", methods=["POST"])
+def submit_analysis():
+    data = request.get_json()
+    fen = data.get("fen")
+
+    try:
+        board = chess.Board(fen)
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid FEN ({fen})"}), 400
+
+    try:
+        depth = parse_limit(data, "depth", int)
+        time_limit = parse_limit(data, "time_limit", float)
+        node_limit = parse_limit(data, "node_limit", int)
+        multipv = parse_limit(data, "multipv", int) or 1
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid parameter ({e})"}), 400
+
+    if depth is None and time_limit is None and node_limit is None:
+        depth = 3
+
+    time_limit = min(time_limit or MAX_ANALYSIS_TIME_LIMIT, MAX_ANALYSIS_TIME_LIMIT)
+
+    job = analysis_jobs.submit(board.fen(), depth, time_limit, node_limit, min(multipv, MAX_MULTIPV))
+    return jsonify(job.to_dict()), 202
+
+
+@app.route("/analysis/<job_id>", methods=["GET"])
+def get_analysis(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job ({job_id})"}), 404
+
+    return jsonify(job.to_dict())
+
+
+@app.route("/analysis/<job_id>", methods=["DELETE"])
+def cancel_analysis(job_id):
+    job = analysis_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job ({job_id})"}), 404
+
+    return jsonify(job.to_dict())
+
+
+@app.route("/analysis/<job_id>/stream", methods=["GET"])
+def stream_analysis(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job ({job_id})"}), 404
+
+    # server sent events, one progress event per completed iteration and a final result event
+    def events():
+        seen = 0
+        while True:
+            progress, status = job.wait_for_update(seen, STREAM_KEEPALIVE)
+            for info in progress:
+                yield f"event: progress\ndata: {json.dumps(info)}\n\n"
+            seen += len(progress)
+
+            if status in job.FINISHED:
+                yield f"event: result\ndata: {json.dumps(job.to_dict(include_progress=False))}\n\n"
+                return
+
+            if not progress:
+                yield ": keep alive\n\n"
+
+    return Response(events(), mimetype="text/event-stream")
+
+
+@app.route("/engine-pool", methods=["GET"])
+def engine_pool_stats():
+    return jsonify(dict(engine_pool.stats(), result_cache=result_cache.stats()))
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    profile = None
+    if PROFILE:
+        profile = Profiler.combine(engine.profiler for engine in engine_pool.engines).report()
+
+    return jsonify({
+        "profiling": PROFILE,
+        "engine_pool": engine_pool.stats(),
+        "result_cache": result_cache.stats(),
+        "profile": profile,
+    })
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    start_engines()
+    # the reloader would run the server in a second process and restart it on every change, each time with a new
+    # process pool, so it stays off
+    app.run(debug=True, use_reloader=False)
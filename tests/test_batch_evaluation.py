@@ -0,0 +1,44 @@
+import random
+
+import chess
+
+from Core.Benchmarks.bench import POSITIONS
+from Core.Evaluation.BatchEvaluation import BatchEvaluation
+from Core.Evaluation.Evaluation import Evaluation
+
+
+def random_game_boards(num_games, seed, max_moves=200):
+    rng = random.Random(seed)
+
+    boards = []
+    for _ in range(num_games):
+        board = chess.Board()
+        while not board.is_game_over() and len(board.move_stack) < max_moves:
+            board.push(rng.choice(list(board.legal_moves)))
+            boards.append(board.copy(stack=False))
+
+    return boards
+
+
+def test_batch_matches_scalar_evaluation():
+    evaluation = Evaluation()
+    # positions from openings down to bare kings, over several chunks
+    boards = random_game_boards(100, seed=1)
+    batch_evaluation = BatchEvaluation(evaluation)
+    batch_evaluation.CHUNK_SIZE = 1000
+
+    scores = batch_evaluation.evaluate(BatchEvaluation.pack(boards))
+
+    assert [int(score) for score in scores] == [evaluation.evaluate(board) for board in boards]
+
+
+def test_pack_fens_reads_fens_and_epd():
+    evaluation = Evaluation()
+    fens = [fen for _, fen in POSITIONS]
+    # epd lines have operations where the move counters would be
+    epds = [chess.Board(fen).epd(id=category) for category, fen in POSITIONS[:4]]
+
+    scores = evaluation.evaluate_batch(BatchEvaluation.pack_fens(fens + epds))
+
+    expected = [evaluation.evaluate(chess.Board(fen)) for fen in fens + fens[:4]]
+    assert [int(score) for score in scores] == expected
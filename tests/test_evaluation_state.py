@@ -0,0 +1,117 @@
+import random
+
+import chess
+import pytest
+
+from Core.Benchmarks.perft import POSITIONS, perft
+from Core.Evaluation.Evaluation import Evaluation
+from Core.Evaluation.EvaluationState import EvaluationState
+from Core.Evaluation.PieceSquareTables import PieceSquareTables, PieceTables
+from Core.Search.Position import Position
+from Core.Search.Zobrist import Zobrist
+
+TABLE_PIECES = {
+    PieceTables.PAWNS_START: chess.PAWN,
+    PieceTables.PAWNS_ENDGAME: chess.PAWN,
+    PieceTables.KNIGHTS: chess.KNIGHT,
+    PieceTables.BISHOPS: chess.BISHOP,
+    PieceTables.ROOKS: chess.ROOK,
+    PieceTables.QUEENS: chess.QUEEN,
+    PieceTables.KING_START: chess.KING,
+    PieceTables.KING_ENDGAME: chess.KING,
+}
+
+
+def random_games(num_games, seed, max_moves=120):
+    # (board, position) after every move of random games, both kept up to date move by move
+    rng = random.Random(seed)
+
+    for _ in range(num_games):
+        board = chess.Board()
+        position = Position()
+
+        while not board.is_game_over() and len(board.move_stack) < max_moves:
+            move = rng.choice(list(board.legal_moves))
+            board.push(move)
+            position.push(Position.encode_move(move))
+            yield board, position
+
+
+def table_by_table_score(board, colour, endgame_t):
+    # the piece-square score summed one table at a time, as evaluate did before the sums were kept incrementally
+    colour_tables = PieceSquareTables().get_colour_tables(colour)
+
+    score = 0
+    for piece_table in PieceTables:
+        table_score = sum(colour_tables[piece_table][56 ^ square]
+                          for square in board.pieces(TABLE_PIECES[piece_table], colour))
+
+        if piece_table in (PieceTables.PAWNS_START, PieceTables.KING_START):
+            score += table_score * (1 - endgame_t)
+        elif piece_table in (PieceTables.PAWNS_ENDGAME, PieceTables.KING_ENDGAME):
+            score += table_score * endgame_t
+        else:
+            score += table_score
+
+    return int(score)
+
+
+def test_incremental_evaluation_matches_a_fresh_board():
+    evaluation = Evaluation()
+
+    for board, position in random_games(20, seed=1):
+        assert evaluation.evaluate(position) == evaluation.evaluate(chess.Board(board.fen()))
+
+
+def test_piece_square_scores_match_the_tables_summed_one_by_one():
+    rng = random.Random(2)
+
+    for board, position in random_games(20, seed=2):
+        for colour in (chess.WHITE, chess.BLACK):
+            # the interpolation is checked at the ends as well as in between
+            for endgame_t in (0, 1, rng.random()):
+                assert Evaluation._evaluate_piece_square_tables(position.eval_state, colour, endgame_t) \
+                    == table_by_table_score(board, colour, endgame_t)
+
+
+def snapshot(position):
+    state = position.eval_state
+    return (
+        position.fen(), position.zobrist_key, position.pawn_key,
+        [list(counts) for counts in state.piece_counts],
+        [list(scores) for scores in state.midgame_scores],
+        [list(scores) for scores in state.endgame_scores],
+    )
+
+
+def test_pop_restores_the_position():
+    for board, position in random_games(10, seed=3):
+        before = snapshot(position)
+
+        for move in list(position.legal_moves):
+            position.push(move)
+            position.pop()
+            assert snapshot(position) == before
+
+
+def test_position_follows_python_chess():
+    for board, position in random_games(20, seed=4):
+        assert position.fen() == board.fen()
+        assert {Position.decode_move(move) for move in position.legal_moves} == set(board.legal_moves)
+        assert position.is_check() == board.is_check()
+
+        # keys kept up to date move by move agree with ones hashed from scratch
+        assert position.zobrist_key == Zobrist.hash_board(board)
+        assert position.pawn_key == Zobrist.hash_pawns(board)
+
+        state = EvaluationState.from_board(board)
+        assert position.eval_state.piece_counts == state.piece_counts
+        assert position.eval_state.midgame_scores == state.midgame_scores
+        assert position.eval_state.endgame_scores == state.endgame_scores
+
+
+@pytest.mark.parametrize("name, fen, counts", POSITIONS)
+def test_perft(name, fen, counts):
+    # the first three depths of the known leaf counts keep the test quick
+    for depth, count in enumerate(counts[:3], 1):
+        assert perft(Position(fen), depth) == count
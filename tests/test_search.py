@@ -0,0 +1,66 @@
+import chess
+import pytest
+
+from Core.Benchmarks.bench import POSITIONS
+from Core.Evaluation.Evaluation import Evaluation
+from Core.Search.MovePicker import MovePicker
+from Core.Search.Position import Position
+from Core.Search.Search import Search
+from Core.Search.Tablebase import Tablebase
+
+DEPTH = 3
+
+
+def full_width_search():
+    # with the selectivity switched off, pvs, aspiration windows and the transposition table only change how fast
+    # the score is found
+    return Search(tablebase=Tablebase(), null_move_pruning=False, late_move_reductions=False, futility_pruning=False)
+
+
+def alpha_beta(search, position, depth, alpha, beta, ply):
+    # plain fail hard alpha-beta, no transposition table, null windows or aspiration, with the same draws and
+    # quiescence at the horizon
+    if ply > 0 and search._is_draw(position):
+        return 0
+
+    if depth == 0:
+        return search.quiescence(position, alpha, beta, ply)
+
+    moves = list(MovePicker(position))
+    if not moves:
+        return -Evaluation.CHECKMATE_SCORE + ply if position.is_check() else 0
+
+    for move in moves:
+        position.push(move)
+        score = -alpha_beta(search, position, depth - 1, -beta, -alpha, ply + 1)
+        position.pop()
+
+        if score >= beta:
+            return beta
+        alpha = max(alpha, score)
+
+    return alpha
+
+
+def reference_score(fen, depth, move=None):
+    # from the side to move, of the best move or of the given one
+    search = full_width_search()
+    position = Position(fen)
+
+    if move is not None:
+        position.push(Position.encode_move(move))
+        return -alpha_beta(search, position, depth - 1, -Search.INFINITY, Search.INFINITY, 1)
+
+    return alpha_beta(search, position, depth, -Search.INFINITY, Search.INFINITY, 0)
+
+
+@pytest.mark.parametrize("category, fen", POSITIONS)
+def test_search_matches_plain_alpha_beta(category, fen):
+    best_move, evaluation = full_width_search().search(chess.Board(fen), max_depth=DEPTH, time_limit=float('inf'))
+
+    perspective = 1 if chess.Board(fen).turn == chess.WHITE else -1
+    best_score = reference_score(fen, DEPTH)
+
+    assert evaluation * perspective == best_score
+    # moves that tie may be found in another order, but the one chosen has to be worth the best score
+    assert reference_score(fen, DEPTH, best_move) == best_score